@@ -6,6 +6,8 @@ import inc.hashtopolis as hashtopolis
 import inc.hashes_com as hashes_com
 import inc.hashmob_net as hashmob_net
 import inc.algorithms as algorithms
+import inc.http_client as http_client
+import inc.http_cache as http_cache
 
 # Core HashMaster Functions
 
@@ -87,6 +89,38 @@ def main():
                         required=False
                         )
 
+    parser.add_argument('-htic',      '--hashtopolis_import_cracked',
+                        nargs=2,
+                        metavar=('HASHLIST_ID', 'FILE'),
+                        help='Import a hash:plain file into a Hashtopolis hashlist',
+                        required=False
+                        )
+
+    parser.add_argument('--resume',
+                        action='store_true',
+                        help='Continue an interrupted --hashtopolis_import_cracked run from its last checkpoint',
+                        required=False
+                        )
+
+    parser.add_argument('--dedupe',
+                        choices=['exact', 'bloom', 'auto'],
+                        help='Drop duplicate lines of the --hashtopolis_import_cracked file before upload',
+                        required=False
+                        )
+
+    parser.add_argument('--validate',
+                        action='store_true',
+                        help='Drop lines of the --hashtopolis_import_cracked file that do not match the hashlist\'s hash type',
+                        required=False
+                        )
+
+    parser.add_argument('--max_in_flight',
+                        type=int,
+                        default=1,
+                        help='Number of import chunks sent to Hashtopolis at the same time (default: 1)',
+                        required=False
+                        )
+
     # Parse the command-line arguments
     args = parser.parse_args()
     ###################################################
@@ -134,7 +168,30 @@ def main():
             )
         )
 
+    # If the -htic flag is set, call the hashtopolis.import_precracked_hashes() function
+    if args.hashtopolis_import_cracked:
+        # import_precracked_hashes(htserver, accesskey, hashlistId, filename, ..., max_in_flight=1, resume=False, dedupe=None, validate=False)
+        hashlist_id, import_file = args.hashtopolis_import_cracked
+        print(
+            json.dumps(
+                hashtopolis.import_precracked_hashes(
+                    config["settings"]["hashtopolis"]["url"],
+                    config["settings"]["hashtopolis"]["api_key"],
+                    int(hashlist_id),
+                    import_file,
+                    max_in_flight=args.max_in_flight,
+                    resume=args.resume,
+                    dedupe=args.dedupe,
+                    validate=args.validate
+                ),
+                indent=4
+            )
+        )
+
 if __name__ == "__main__":
     load_config()
+    http_client.configure_from_config(config)
+    http_cache.configure_from_config(config)
+    hashes_com.ticker_cache_ttl = config["settings"]["hashes_com"].get("ticker_cache_ttl", hashes_com.ticker_cache_ttl)
     main()
     exit()
@@ -1,8 +1,48 @@
-slowalgs = (400, 500, 1600, 1800, 3200, 7400, 7100, 9200, 10000, 10900, 11900, 12000, 12100, 20200, 20300, 20400, 22000, 12001, 25600, 25800, 28400, 30600)
+from collections import namedtuple
+from types import MappingProxyType
 
-mixed_irreration_algs = ( 3200, 25600 )
+# Registry of the hashcat modes this project knows about. Each mode is one immutable Algorithm record in "registry",
+# keyed by its int mode number. The tables below are only the source data the registry is built from; slowalgs,
+# mixed_irreration_algs and validalgs at the end of this file are kept as views of the registry for older callers.
+# Example:
+#     algorithm = algorithms.get(3200)
+#     algorithm.name, algorithm.slow, algorithm.cost, algorithm.brain    # ('bcrypt $2*$, Blowfish (Unix)', True, 890000.0, True)
 
-validalgs = {
+# Slow (iterated or memory hard) hash modes.
+_slow_modes = (400, 500, 1600, 1800, 3200, 7400, 7100, 9200, 10000, 10900, 11900, 12000, 12100, 20200, 20300, 20400, 22000, 12001, 25600, 25800, 28400, 30600)
+
+# Modes where the iteration count is part of each hash, so hashes in one list can have very different costs.
+_mixed_iteration_modes = (3200, 25600)
+
+# Approximate cost of one guess relative to MD5, from hashcat benchmark speeds on a single GPU (MD5 speed / mode speed).
+# Only meant to rank modes against each other. Modes that are not listed cost 1.0 if fast and _default_slow_cost if slow.
+_costs = {
+    0: 1.0,
+    100: 3.2,
+    900: 0.57,
+    1000: 0.57,
+    1300: 7.5,
+    1400: 7.5,
+    1700: 22.0,
+    3000: 1.1,
+    5600: 14.0,
+    7500: 40.0,
+    10800: 22.0,
+    13100: 40.0,
+    400: 3600.0,
+    500: 2400.0,
+    1800: 48000.0,
+    2100: 18000.0,
+    3200: 890000.0,
+    7400: 23000.0,
+    10000: 130000.0,
+    22000: 65000.0,
+    25600: 890000.0
+}
+_default_slow_cost = 100000.0
+
+# hashcat names of the modes.
+_names = {
     "0": "MD5",
     "10": "md5($plaintext.$salt)",
     "11": "Joomla < 2.5.18",
@@ -182,5 +222,163 @@ validalgs = {
     "28200": "Exodus Desktop Wallet (scrypt)",
     "28800": "Kerberos 5, etype 17, DB",
     "28900": "Kerberos 5, etype 18, DB",
-    "99849": "Yescrypt $y$"
-}
\ No newline at end of file
+    "99849": "Yescrypt $y$",
+    "20200": "Python passlib pbkdf2-sha512",
+    "20300": "Python passlib pbkdf2-sha256",
+    "20400": "Python passlib pbkdf2-sha1",
+    "25800": "bcrypt(sha1($plaintext))",
+    "28400": "bcrypt(sha512($plaintext))",
+    "30600": "bcrypt(sha256($plaintext))"
+}
+# Hash formats used to validate hashlist lines before they are uploaded, keyed by hashcat mode.
+# "charset" and "length": the hash is exactly length characters of one of the charsets below.
+# "pattern": a regular expression for hashes that do not fit a charset and length, e.g. crypt formats.
+# "prefix": the fixed start of the hash, so lines can be told apart cheaply before the pattern is tried.
+# "salted": the hash is followed by the separator and a salt (hash:salt).
+# Modes that are not listed here are not validated.
+charsets = {
+    "hex": "[0-9a-fA-F]",
+    "base64": "[A-Za-z0-9+/]",
+    "crypt": "[./0-9A-Za-z]"
+}
+
+hash_formats = {
+    0: {"charset": "hex", "length": 32},
+    10: {"charset": "hex", "length": 32, "salted": True},
+    11: {"charset": "hex", "length": 32, "salted": True},
+    20: {"charset": "hex", "length": 32, "salted": True},
+    21: {"charset": "hex", "length": 32, "salted": True},
+    50: {"charset": "hex", "length": 32, "salted": True},
+    60: {"charset": "hex", "length": 32, "salted": True},
+    100: {"charset": "hex", "length": 40},
+    101: {"prefix": "{SHA}", "pattern": r"\{SHA\}[A-Za-z0-9+/]{27}="},
+    110: {"charset": "hex", "length": 40, "salted": True},
+    111: {"prefix": "{SSHA}", "pattern": r"\{SSHA\}[A-Za-z0-9+/]{28,}={0,2}"},
+    120: {"charset": "hex", "length": 40, "salted": True},
+    124: {"prefix": "sha1$", "pattern": r"sha1\$[^$:\r\n]*\$[0-9a-fA-F]{40}"},
+    130: {"charset": "hex", "length": 40, "salted": True},
+    140: {"charset": "hex", "length": 40, "salted": True},
+    160: {"charset": "hex", "length": 40, "salted": True},
+    170: {"charset": "hex", "length": 40},
+    200: {"charset": "hex", "length": 16},
+    300: {"charset": "hex", "length": 40},
+    400: {"prefix": "$P$", "pattern": r"\$[PH]\$[./0-9A-Za-z]{31}"},
+    500: {"prefix": "$1$", "pattern": r"\$1\$[^$:\r\n]{0,8}\$[./0-9A-Za-z]{22}"},
+    900: {"charset": "hex", "length": 32},
+    1000: {"charset": "hex", "length": 32},
+    1300: {"charset": "hex", "length": 56},
+    1400: {"charset": "hex", "length": 64},
+    1410: {"charset": "hex", "length": 64, "salted": True},
+    1420: {"charset": "hex", "length": 64, "salted": True},
+    1450: {"charset": "hex", "length": 64, "salted": True},
+    1460: {"charset": "hex", "length": 64, "salted": True},
+    1600: {"prefix": "$apr1$", "pattern": r"\$apr1\$[^$:\r\n]{0,8}\$[./0-9A-Za-z]{22}"},
+    1700: {"charset": "hex", "length": 128},
+    1710: {"charset": "hex", "length": 128, "salted": True},
+    1711: {"prefix": "{SSHA512}", "pattern": r"\{SSHA512\}[A-Za-z0-9+/]{88,}={0,2}"},
+    1720: {"charset": "hex", "length": 128, "salted": True},
+    1750: {"charset": "hex", "length": 128, "salted": True},
+    1760: {"charset": "hex", "length": 128, "salted": True},
+    1800: {"prefix": "$6$", "pattern": r"\$6\$(?:rounds=\d+\$)?[^$:\r\n]{0,16}\$[./0-9A-Za-z]{86}"},
+    2100: {"prefix": "$DCC2$", "pattern": r"\$DCC2\$\d+#[^#\r\n]+#[0-9a-fA-F]{32}"},
+    2600: {"charset": "hex", "length": 32},
+    2611: {"charset": "hex", "length": 32, "salted": True},
+    2612: {"prefix": "$PHPS$", "pattern": r"\$PHPS\$[0-9a-fA-F]+\$[0-9a-fA-F]{32}"},
+    2711: {"charset": "hex", "length": 32, "salted": True},
+    2811: {"charset": "hex", "length": 32, "salted": True},
+    3000: {"charset": "hex", "length": 16},
+    3200: {"prefix": "$2", "pattern": r"\$2[abxy]?\$\d{2}\$[./0-9A-Za-z]{53}"},
+    3910: {"charset": "hex", "length": 32, "salted": True},
+    4110: {"charset": "hex", "length": 32, "salted": True},
+    4400: {"charset": "hex", "length": 32},
+    5100: {"charset": "hex", "length": 16},
+    5600: {"pattern": r"[^:\r\n]+::[^:\r\n]*:[0-9a-fA-F]{16}:[0-9a-fA-F]{32}:[0-9a-fA-F]+"},
+    6100: {"charset": "hex", "length": 128},
+    6900: {"charset": "hex", "length": 64},
+    7400: {"prefix": "$5$", "pattern": r"\$5\$(?:rounds=\d+\$)?[^$:\r\n]{0,16}\$[./0-9A-Za-z]{43}"},
+    7500: {"prefix": "$krb5pa$23$", "pattern": r"\$krb5pa\$23\$[^\r\n]+"},
+    7900: {"prefix": "$S$", "pattern": r"\$S\$[./0-9A-Za-z]{52}"},
+    9200: {"prefix": "$8$", "pattern": r"\$8\$[./0-9A-Za-z]{14}\$[./0-9A-Za-z]{43}"},
+    9300: {"prefix": "$9$", "pattern": r"\$9\$[./0-9A-Za-z]{14}\$[./0-9A-Za-z]{43}"},
+    10000: {"prefix": "pbkdf2_sha256$", "pattern": r"pbkdf2_sha256\$\d+\$[^$:\r\n]+\$[A-Za-z0-9+/]{43}="},
+    10800: {"charset": "hex", "length": 96},
+    12001: {"prefix": "{PKCS5S2}", "pattern": r"\{PKCS5S2\}[A-Za-z0-9+/]{64}"},
+    13100: {"prefix": "$krb5tgs$23$", "pattern": r"\$krb5tgs\$23\$[^\r\n]+"},
+    16500: {"pattern": r"[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+"},
+    17400: {"charset": "hex", "length": 64},
+    17500: {"charset": "hex", "length": 96},
+    17700: {"charset": "hex", "length": 56},
+    17800: {"charset": "hex", "length": 64},
+    17900: {"charset": "hex", "length": 96},
+    18000: {"charset": "hex", "length": 128},
+    20710: {"charset": "hex", "length": 64, "salted": True},
+    20800: {"charset": "hex", "length": 64},
+    20900: {"charset": "hex", "length": 32},
+    21100: {"charset": "hex", "length": 40, "salted": True},
+    21200: {"charset": "hex", "length": 32, "salted": True},
+    21300: {"charset": "hex", "length": 32, "salted": True},
+    22000: {"prefix": "WPA*", "pattern": r"WPA\*0[12]\*[^\r\n]+"},
+    22300: {"charset": "hex", "length": 64, "salted": True},
+    24300: {"charset": "hex", "length": 40, "salted": True},
+    25600: {"prefix": "$2", "pattern": r"\$2[abxy]?\$\d{2}\$[./0-9A-Za-z]{53}"},
+    99849: {"prefix": "$y$", "pattern": r"\$y\$[./0-9A-Za-z]+\$[./0-9A-Za-z]*\$[./0-9A-Za-z]{43}"}
+}
+
+def hash_pattern(hashtype):
+    # Return the regular expression (str) for the hash part of a line of this hashcat mode, or None if the mode has no
+    # known format. The salt of salted modes is not part of the pattern.
+    hash_format = hash_formats.get(int(hashtype))
+    if hash_format is None:
+        return None
+    if 'pattern' in hash_format:
+        return hash_format['pattern']
+    return '%s{%d}' % (charsets[hash_format['charset']], hash_format['length'])
+
+# One hashcat mode.
+# id: hashcat mode number. name: hashcat name. slow: True for slow (iterated or memory hard) modes.
+# cost: approximate cost of one guess relative to MD5. brain: True if tasks for this mode should use the hashcat brain.
+# mixed_iterations: True if the iteration count is part of each hash. format: entry of hash_formats, or None.
+Algorithm = namedtuple('Algorithm', ('id', 'name', 'slow', 'cost', 'brain', 'mixed_iterations', 'format'))
+
+def _build_registry():
+    registry = {}
+    slow_modes = frozenset(_slow_modes)
+    for key, name in _names.items():
+        hashtype = int(key)
+        slow = hashtype in slow_modes
+        registry[hashtype] = Algorithm(
+            id=hashtype,
+            name=name,
+            slow=slow,
+            cost=_costs.get(hashtype, _default_slow_cost if slow else 1.0),
+            # The brain only pays off when a guess costs more than looking it up, which is the case for slow modes.
+            brain=slow,
+            mixed_iterations=hashtype in _mixed_iteration_modes,
+            format=MappingProxyType(hash_formats[hashtype]) if hashtype in hash_formats else None
+        )
+    return MappingProxyType(registry)
+
+# {mode (int): Algorithm}, read-only.
+registry = _build_registry()
+
+def get(hashtype):
+    # Return the Algorithm record of a mode (int or str), or None if the mode is unknown.
+    try:
+        return registry.get(int(hashtype))
+    except (TypeError, ValueError):
+        return None
+
+def is_slow(hashtype):
+    algorithm = get(hashtype)
+    return algorithm is not None and algorithm.slow
+
+def brain_eligible(hashtype):
+    algorithm = get(hashtype)
+    return algorithm is not None and algorithm.brain
+
+# Compatibility views of the registry for older callers.
+slowalgs = tuple(hashtype for hashtype in _slow_modes if hashtype in registry)
+
+mixed_irreration_algs = tuple(hashtype for hashtype in _mixed_iteration_modes if hashtype in registry)
+
+validalgs = {str(hashtype): algorithm.name for hashtype, algorithm in registry.items()}
@@ -0,0 +1,30 @@
+#!/bin/env python3
+import os
+import threading
+from contextlib import contextmanager
+
+# Small helpers shared by the other inc/ modules.
+
+def config_section(config, section):
+    # Return the optional "settings" -> section object of the loaded config.json, or an empty dict if there is none.
+    return config.get('settings', {}).get(section) or {}
+
+@contextmanager
+def atomic_write(file_path, mode='w', **open_kwargs):
+    # Open a temporary file next to file_path and rename it to file_path once the with block finished without an error.
+    # Readers never see a half written file, and a failed write leaves the existing file as it was.
+    # The temporary name includes the process and thread, so concurrent writers of the same file do not collide.
+    # Example:
+    #     with atomic_write('state.json') as f:
+    #         json.dump(state, f)
+    temp_file_path = '%s.%s.%s.tmp' % (file_path, os.getpid(), threading.get_ident())
+    try:
+        with open(temp_file_path, mode, **open_kwargs) as f:
+            yield f
+        os.replace(temp_file_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_file_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,56 @@
+#!/bin/env python3
+import json
+from datetime import datetime
+import inc.common as common
+
+# Local watermark store for incremental plaintext harvests.
+# For every Hashtopolis server it records how many cracked hashes each hashlist had when its plaintexts were last
+# harvested, so the next harvest only has to download the hashlists whose cracked count changed.
+# Example state file:
+# {
+#     "servers": {
+#         "http://10.100.100.200:80": {
+#             "hashlists": {
+#                 "5": {"cracked": 1520, "harvested": "2024-10-03 10:49:58"}
+#             }
+#         }
+#     }
+# }
+
+def load_state(state_file):
+    # Load the state file. A missing or unreadable state file returns an empty state, which makes the next harvest a full one.
+    try:
+        with open(state_file, 'r') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {"servers": {}}
+    except json.JSONDecodeError:
+        print("Error: %s is not a valid JSON file, starting a full harvest." % state_file)
+        return {"servers": {}}
+    state.setdefault("servers", {})
+    return state
+
+def save_state(state_file, state):
+    with common.atomic_write(state_file) as f:
+        json.dump(state, f, indent=4)
+
+def get_watermarks(state, htserver):
+    # Return the {hashlistId (str): {"cracked": ..., "harvested": ...}} watermarks of a server.
+    return state["servers"].setdefault(htserver, {}).setdefault("hashlists", {})
+
+def changed_hashlists(state, htserver, cracked_counts):
+    # Compare the current {hashlistId: cracked count} of a server with the stored watermarks and return the hashlist IDs
+    # that have to be harvested again. Hashlists without a watermark are always returned.
+    watermarks = get_watermarks(state, htserver)
+    changed = []
+    for hashlistId, cracked in cracked_counts.items():
+        watermark = watermarks.get(str(hashlistId))
+        if watermark is None or watermark["cracked"] != cracked:
+            changed.append(hashlistId)
+    return changed
+
+def set_watermark(state, htserver, hashlistId, cracked):
+    get_watermarks(state, htserver)[str(hashlistId)] = {
+        "cracked": cracked,
+        "harvested": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
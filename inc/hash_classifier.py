@@ -0,0 +1,119 @@
+#!/bin/env python3
+import os
+import re
+import inc.algorithms as algorithms
+import inc.import_pipeline as import_pipeline
+
+# Sorts the lines of a mixed hash file (e.g. NTLM, MD5, SHA1 and bcrypt lines in one intake file) into one bucket per
+# hash type in a single pass.
+# Hash types whose formats in inc/algorithms.py describe the same line shape (MD5, MD4 and NTLM are all 32 hex
+# characters) are candidates of the same bucket. The bucket is named after the candidate with the highest priority.
+# All shapes are compiled into one multi-line regex, so each line is classified with a single regex match.
+# Example:
+#     classification = classify_file('intake.txt', output_dir='intake_split')
+#     # {"buckets": {"0": {"name": "MD5", "candidates": [0, 900, 1000, ...], "lines": 1200, "file": "intake_split/intake.txt.0.txt"}, ...},
+#     #  "unknown": {"lines": 3, "file": "intake_split/intake.txt.unknown.txt"}}
+
+# Hash types picked first when a line matches several of them. Types that are not listed come after these, lowest mode first.
+default_priority = (0, 1000, 900, 100, 300, 1400, 1700, 10800, 1300, 3200, 1800, 500, 7400, 400)
+
+def _rank(hashtype, priority):
+    if hashtype in priority:
+        return priority.index(hashtype)
+    return len(priority) + hashtype
+
+def build_shapes(priority=default_priority, include_salted=False):
+    # Group the hash types with a known format by their line pattern.
+    # Returns a list of (pattern, candidates) with the candidates sorted by priority. Patterns with a fixed prefix or
+    # their own regex come first, so they are tried before the plain charset and length patterns.
+    shapes = {}
+    for hashtype, hash_format in algorithms.hash_formats.items():
+        if hash_format.get('salted') and not include_salted:
+            continue
+        pattern = algorithms.hash_pattern(hashtype)
+        if hash_format.get('salted'):
+            pattern += ':[^\\r\\n]*'
+        shapes.setdefault(pattern, []).append(hashtype)
+    ordered = []
+    for pattern, candidates in shapes.items():
+        candidates.sort(key=lambda hashtype: _rank(hashtype, priority))
+        specific = 'pattern' in algorithms.hash_formats[candidates[0]]
+        ordered.append((0 if specific else 1, pattern, candidates))
+    ordered.sort(key=lambda shape: shape[0])
+    return [(pattern, candidates) for _, pattern, candidates in ordered]
+
+class HashClassifier:
+    # Classifies chunks of lines. Every line of a chunk ends up in exactly one bucket: the hash type with the highest
+    # priority of the matching shape, or None for lines that match no known format.
+    def __init__(self, priority=default_priority, include_salted=False):
+        self.shapes = build_shapes(tuple(priority), include_salted)
+        groups = ['(?P<s%d>%s)' % (index, pattern) for index, (pattern, _) in enumerate(self.shapes)]
+        # The last alternative takes any other line, so every line is returned by finditer. It also takes a \r inside
+        # the line, only a \r right before the line break is part of the line break.
+        groups.append('(?P<unknown>[^\\r\\n]*(?:\\r(?!$)[^\\r\\n]*)*)')
+        self.regex = re.compile(('^[ \\t]*(?:%s)[ \\t]*\\r?$\\n?' % '|'.join(groups)).encode(), re.MULTILINE)
+        # Group name -> hash type, and hash type -> all candidates of its shape.
+        self.group_types = {'s%d' % index: candidates[0] for index, (_, candidates) in enumerate(self.shapes)}
+        self.group_types['unknown'] = None
+        self.candidates = {candidates[0]: candidates for _, candidates in self.shapes}
+
+    def classify_chunk(self, data):
+        # Return {hashtype or None: [lines]} for a chunk of lines. Lines are stripped and end with \n, blank lines are dropped.
+        buckets = {}
+        group_types = self.group_types
+        for match in self.regex.finditer(data):
+            # The matched group holds the line without surrounding whitespace and line break.
+            line = match.group(match.lastgroup)
+            if not line:
+                continue
+            hashtype = group_types[match.lastgroup]
+            bucket = buckets.get(hashtype)
+            if bucket is None:
+                bucket = buckets[hashtype] = []
+            bucket.append(line + b'\n')
+        return buckets
+
+def classify_file(file_path, output_dir=None, priority=default_priority, include_salted=False, chunk_size_mb=8):
+    # Stream a file through a HashClassifier and write the lines of each hash type to "<output_dir>/<file name>.<hashtype>.txt",
+    # and lines without a known format to "<file name>.unknown.txt". output_dir defaults to the directory of the file.
+    # include_salted also tries the salted formats (hash:salt), which are left out by default because a raw hash file
+    # should not contain separators.
+    # Returns {"buckets": {hashtype (str): {"name", "candidates", "lines", "file"}}, "unknown": {"lines", "file"}}.
+    classifier = HashClassifier(priority, include_salted)
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = os.path.basename(file_path)
+    result = {"buckets": {}, "unknown": {"lines": 0, "file": None}}
+    output_files = {}
+    try:
+        with import_pipeline.FileChunker(file_path) as chunker:
+            while True:
+                chunk = chunker.next_chunk(chunk_size_mb * 1024 * 1024)
+                if chunk is None:
+                    break
+                with chunk as data:
+                    buckets = classifier.classify_chunk(data)
+                for hashtype, lines in buckets.items():
+                    if hashtype is None:
+                        entry = result['unknown']
+                        suffix = 'unknown'
+                    else:
+                        entry = result['buckets'].get(str(hashtype))
+                        if entry is None:
+                            entry = result['buckets'][str(hashtype)] = {
+                                "name": algorithms.registry[hashtype].name if hashtype in algorithms.registry else str(hashtype),
+                                "candidates": classifier.candidates[hashtype],
+                                "lines": 0,
+                                "file": None
+                            }
+                        suffix = str(hashtype)
+                    if hashtype not in output_files:
+                        entry['file'] = os.path.join(output_dir, '%s.%s.txt' % (base_name, suffix))
+                        output_files[hashtype] = open(entry['file'], 'wb')
+                    output_files[hashtype].write(b''.join(lines))
+                    entry['lines'] += len(lines)
+    finally:
+        for output_file in output_files.values():
+            output_file.close()
+    return result
@@ -0,0 +1,75 @@
+#!/bin/env python3
+import re
+from functools import lru_cache
+import inc.algorithms as algorithms
+import inc.import_pipeline as import_pipeline
+
+# Client-side validation of hashlist and hash:plain lines against the formats in inc/algorithms.py.
+# Each hash type is compiled once into a multi-line bytes regex that matches whole valid lines. A chunk of lines is
+# validated with one findall() call, so the per-line work stays inside the regex engine instead of a Python loop.
+# Lines Hashtopolis would reject ("Invalid hashlist format!" on createHashlist, invalidLines on importCracked) are
+# dropped before they are uploaded.
+# Example:
+#     validator = get_validator(0)
+#     valid_lines, invalid_count = validator.filter_chunk(b'098f6bcd4621d373cade4e832627b4f6\nnot a hash\n')
+
+@lru_cache(maxsize=None)
+def _compile(hashtype, cracked, separator):
+    # Return the (chunk regex, line regex) for a hash type, or None if the hash type has no known format.
+    pattern = algorithms.hash_pattern(hashtype)
+    if pattern is None:
+        return None
+    separator = re.escape(separator).encode()
+    line = b'(?:' + pattern.encode() + b')'
+    if algorithms.hash_formats[int(hashtype)].get('salted'):
+        # The salt runs to the end of the line, or up to the plain of a hash:salt:plain line.
+        line += separator + b'[^\r\n]*'
+    if cracked:
+        # hash:plain lines, the plain can be anything up to the end of the line.
+        line += separator + b'[^\n]*'
+    chunk_regex = re.compile(b'^' + line + b'\r?$\n?', re.MULTILINE)
+    line_regex = re.compile(line + b'\r?\n?')
+    return chunk_regex, line_regex
+
+class HashValidator(import_pipeline.LineFilter):
+    # Validates the lines of one hash type. With cracked=True lines are "hash:plain" lines for importCracked, otherwise
+    # they are hashlist lines for createHashlist. The number of invalid lines dropped so far is kept in .invalid.
+    def __init__(self, hashtype, cracked=False, separator=':'):
+        self.hashtype = int(hashtype)
+        self.chunk_regex, self.line_regex = _compile(self.hashtype, cracked, separator)
+        self.invalid = 0
+
+    def matches(self, line):
+        return self.line_regex.fullmatch(line) is not None
+
+    def filter_chunk(self, data):
+        # Return the valid lines of a chunk as bytes and the number of invalid lines, blank lines count as invalid.
+        valid = []
+        lines = 0
+        for block in import_pipeline.iter_line_blocks(data):
+            valid += self.chunk_regex.findall(block)
+            lines += block.count(b'\n')
+            if not block.endswith(b'\n'):
+                lines += 1
+        invalid = lines - len(valid)
+        self.invalid += invalid
+        return b''.join(valid), invalid
+
+    def partition(self, data):
+        # Split a chunk into its valid lines (bytes) and a list of the invalid lines, e.g. to write them to a reject file.
+        valid = []
+        invalid = []
+        for block in import_pipeline.iter_line_blocks(data):
+            for line in import_pipeline.split_lines(block):
+                if self.line_regex.fullmatch(line):
+                    valid.append(line)
+                elif line.strip():
+                    invalid.append(line.rstrip(b'\r\n'))
+        self.invalid += len(invalid)
+        return b''.join(valid), invalid
+
+def get_validator(hashtype, cracked=False, separator=':'):
+    # Return a HashValidator for the hash type, or None if inc/algorithms.py has no format for it.
+    if _compile(int(hashtype), cracked, separator) is None:
+        return None
+    return HashValidator(hashtype, cracked, separator)
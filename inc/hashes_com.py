@@ -1,7 +1,12 @@
 import requests
+import threading
+import time
+import numpy as np
 import pandas as pd
 from tabulate import tabulate
 from datetime import datetime, timedelta
+import inc.http_client as http_client
+import inc.http_cache as http_cache
 
 def get_jobs(hashes_com_url, api_key, algorithm_id, created_at=None, min_price_per_hash=None):
     # Function that will perform a https request to "https://hashes.com/en/api/jobs?key=<APIkey>" to get the list of jobs and put the returned JSON in a variable.
@@ -44,21 +49,75 @@ def get_jobs(hashes_com_url, api_key, algorithm_id, created_at=None, min_price_p
     # }
     # Use the loaded config json to get the hashess.com api key
 
-    url = "%s/en/api/jobs?key=%s" % (hashes_com_url, api_key)
-    response = requests.get(url)
-    jobs = response.json()
-    if jobs['success'] == True:
-        jobs_list = jobs['list']
-        if created_at:
-            jobs_list = [job for job in jobs_list if job['algorithmId'] == algorithm_id and datetime.strptime(job['createdAt'], "%Y-%m-%d %H:%M:%S") >= created_at]
-        else:
-            jobs_list = [job for job in jobs_list if job['algorithmId'] == algorithm_id]
+    # To filter the same job list for several algorithms, use get_job_board() once and query() it for each of them.
+    job_board = get_job_board(hashes_com_url, api_key)
+    if job_board is None:
+        return None
+    return job_board.query(algorithm_id, created_at=created_at, min_price_per_hash=min_price_per_hash)
 
-        # If a min_price_per_hash is provided, then filter the jobs that have a pricePerHashUsd greater than or equal to the min_price_per_hash.
+class JobBoard:
+    # The Hashes.com job list parsed once into typed columns, so any number of queries run without another request or
+    # parse. Rows are sorted by pricePerHashUsd (highest first) and then by createdAt (newest first), and indexed by
+    # algorithmId. Queries return the original job dicts in that order.
+    # Example:
+    #     job_board = get_job_board(hashes_com_url, api_key)
+    #     job_board.query([0, 1000], min_price_per_hash=0.5, hash_age_window=240)
+    def __init__(self, jobs_list):
+        self.jobs = jobs_list
+        frame = pd.DataFrame({
+            "position": np.arange(len(jobs_list)),
+            "algorithmId": pd.to_numeric(pd.Series([job.get('algorithmId') for job in jobs_list], dtype='object'), errors='coerce'),
+            "pricePerHashUsd": pd.to_numeric(pd.Series([job.get('pricePerHashUsd') for job in jobs_list], dtype='object'), errors='coerce'),
+            "createdAt": pd.to_datetime(pd.Series([job.get('createdAt') for job in jobs_list], dtype='object'), format="%Y-%m-%d %H:%M:%S", errors='coerce')
+        })
+        frame = frame.sort_values(by=['pricePerHashUsd', 'createdAt'], ascending=[False, False], na_position='last', kind='stable')
+        self.frame = frame.reset_index(drop=True)
+        self.positions = self.frame['position'].to_numpy()
+        self.prices = self.frame['pricePerHashUsd'].to_numpy(dtype='float64')
+        self.created = self.frame['createdAt'].to_numpy()
+        # {algorithmId: row numbers in the sorted frame, ascending}
+        self.algorithm_rows = {int(algorithm_id): rows for algorithm_id, rows in self.frame.groupby('algorithmId').indices.items()}
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def algorithm_ids(self):
+        return sorted(self.algorithm_rows)
+
+    def query(self, algorithm_ids=None, created_at=None, min_price_per_hash=None, hash_age_window=None):
+        # Return the jobs that match all given filters.
+        # algorithm_ids: one algorithm ID (e.g. 1000 or '1000') or a list, set or tuple of them, None for all algorithms.
+        # created_at: only jobs created at or after this datetime.
+        # min_price_per_hash: only jobs with a pricePerHashUsd of at least this value.
+        # hash_age_window: only jobs created in the last hash_age_window hours.
+        if algorithm_ids is None:
+            rows = np.arange(len(self.positions))
+        else:
+            if not isinstance(algorithm_ids, (list, set, frozenset, tuple)):
+                algorithm_ids = [algorithm_ids]
+            groups = [self.algorithm_rows[int(algorithm_id)] for algorithm_id in set(algorithm_ids) if int(algorithm_id) in self.algorithm_rows]
+            if not groups:
+                return []
+            # Row numbers of the sorted frame, so sorting them keeps the price and age order across algorithms.
+            rows = np.sort(np.concatenate(groups))
+        mask = np.ones(len(rows), dtype=bool)
+        if created_at:
+            mask &= self.created[rows] >= np.datetime64(created_at)
+        if hash_age_window:
+            mask &= self.created[rows] >= np.datetime64(datetime.now() - timedelta(hours=hash_age_window))
         if min_price_per_hash:
-            jobs_list = [job for job in jobs_list if float(job['pricePerHashUsd']) >= min_price_per_hash]
+            mask &= self.prices[rows] >= min_price_per_hash
+        return [self.jobs[position] for position in self.positions[rows[mask]]]
 
-        return jobs_list
+def get_job_board(hashes_com_url, api_key):
+    # Fetch the job list once (through the on-disk HTTP cache, unchanged lists are not downloaded and decoded again)
+    # and return it as a JobBoard, or None on error.
+    url = "%s/en/api/jobs?key=%s" % (hashes_com_url, api_key)
+    jobs = http_cache.get_json(url)
+    if jobs is None:
+        return None
+    if jobs['success'] == True:
+        return JobBoard(jobs['list'])
     else:
         print("Error: %s" % (jobs['error']))
         return None
@@ -75,7 +134,7 @@ def submit_cracked_hashes(hashes_com_url, api_key, found_hashes_file, algorithm_
         "userfile": ("founds.txt", open(found_hashes_file, "rb"))
     }
     try:
-        response = requests.post(url, data=data, files=files)
+        response = http_client.post(url, data=data, files=files)
         if response.status_code == 200:
             return response.text
         else:
@@ -94,19 +153,65 @@ def submit_cracked_hashes(hashes_com_url, api_key, found_hashes_file, algorithm_
         print('Error: %s' % error_code)
         return None
 
+# Seconds the Kraken USD prices are cached by get_usd_prices(), to_usd() and convert_to_usd().
+ticker_cache_ttl = 60
+# Kraken result keys of the supported currencies.
+ticker_pairs = {
+    "BTC": "XXBTZUSD",
+    "XMR": "XXMRZUSD",
+    "LTC": "XLTCZUSD"
+}
+_ticker_cache = {"prices": {}, "fetched": 0}
+_ticker_lock = threading.Lock()
+
+def get_usd_prices(ttl=None):
+    # Return the USD ask prices {"BTC": "63123.40000", "XMR": ..., "LTC": ...} of all supported currencies.
+    # All pairs are fetched from the Kraken ticker in one request and cached for ttl seconds (ticker_cache_ttl by default).
+    # If Kraken can not be reached the last known prices are returned, or an empty dict if there are none.
+    if ttl is None:
+        ttl = ticker_cache_ttl
+    with _ticker_lock:
+        if _ticker_cache['prices'] and time.time() - _ticker_cache['fetched'] < ttl:
+            return _ticker_cache['prices']
+        url = "https://api.kraken.com/0/public/Ticker?pair=%s" % ','.join('%sUSD' % currency for currency in ticker_pairs)
+        try:
+            resp = http_client.get(url).json()
+            prices = {currency: resp['result'][pair]['a'][0] for currency, pair in ticker_pairs.items() if pair in resp.get('result', {})}
+        except (requests.exceptions.RequestException, ValueError, KeyError) as error_code:
+            print('Error: Could not get the Kraken ticker prices. %s' % error_code)
+            return _ticker_cache['prices']
+        if not prices:
+            print('Error: Could not get the Kraken ticker prices. %s' % resp.get('error'))
+            return _ticker_cache['prices']
+        _ticker_cache['prices'] = prices
+        _ticker_cache['fetched'] = time.time()
+        return prices
+
+def convert_to_usd(values, currency):
+    # Convert one amount or an array of amounts (numbers or numeric strings) of a currency to USD.
+    # Returns a float, or a numpy float array for arrays. Returns None for credits and currencies without a price.
+    currentprice = get_usd_prices().get(currency.upper())
+    if currentprice is None:
+        return None
+    amounts = pd.to_numeric(pd.Series(np.atleast_1d(np.asarray(values, dtype='object'))), errors='coerce').to_numpy(dtype='float64')
+    converted = amounts * float(currentprice)
+    if np.ndim(values) == 0:
+        return float(converted[0])
+    return converted
+
 def to_usd(value, currency):
      # Converts crypto to USD values using the Kraken API. I took this from 'https://github.com/PlumLulz/hashes.com-cli/blob/master/hashes.py'
+     # The prices come from the cached ticker (see get_usd_prices()). value can also be a list or array of amounts,
+     # then "converted" is a list of strings.
 	if currency != "credits":
-		url = "https://api.kraken.com/0/public/Ticker?pair=%susd" % (currency)
-		resp = requests.get(url).json()
-		#currentprice = resp['USD']
-		if currency.upper() == "BTC":
-			currentprice = resp['result']['XXBTZUSD']['a'][0]
-		elif currency.upper() == "XMR":
-			currentprice = resp['result']['XXMRZUSD']['a'][0]
-		elif currency.upper() == "LTC":
-			currentprice = resp['result']['XLTCZUSD']['a'][0]
-		converted = "${0:.3f}".format(float(value) * float(currentprice))
+		currentprice = get_usd_prices().get(currency.upper())
+		if currentprice is None:
+			return {"currentprice": None, "converted": "N/A"}
+		converted = convert_to_usd(value, currency)
+		if np.ndim(converted) == 0:
+			converted = "${0:.3f}".format(converted)
+		else:
+			converted = ["${0:.3f}".format(amount) for amount in converted]
 		return {"currentprice": currentprice, "converted": converted}
 	else:
 		return {"currentprice": None, "converted": "N/A"}
@@ -114,7 +219,11 @@ def to_usd(value, currency):
 def get_cracked_hash_history(hashes_com_url, api_key):
     # Function that will perform a request to "https://hashes.com/en/api/uploads?key=0ebb2b263f694af6095de96e4aac7d59" toget a JSON of all the cracked hashes.
     url = "%s/en/api/uploads?key=%s" % (hashes_com_url, api_key)
-    response = requests.get(url)
+    try:
+        response = http_client.get(url)
+    except requests.exceptions.RequestException as error_code:
+        print('Error: %s' % error_code)
+        return None
     if response.status_code == 200:
         return response.json()
     else:
@@ -125,7 +234,11 @@ def get_profit(hashes_com_url, api_key):
     # Function that will perform a request to "https://hashes.com/en/api/profit?key=0ebb2b263f694af6095de96e4aac7d59" to get the profitability of the user.
     # curl https://hashes.com/en/api/profit?key=0ebb2b263f694af6095de96e4aac7d59
     url = "%s/en/api/profit?key=%s" % (hashes_com_url, api_key)
-    response = requests.get(url)
+    try:
+        response = http_client.get(url)
+    except requests.exceptions.RequestException as error_code:
+        print('Error: %s' % error_code)
+        return None
     if response.status_code == 200:
         return response.json()
     else:
@@ -146,7 +259,7 @@ def display_profit(hashes_com_url, api_key):
     print("Total XMR: %s" % total_xmr_usd)
     print("Total LTC: %s" % total_ltc_usd)
 
-def display_cracked_hash_history(hashes_com_url, api_key, days):
+def display_cracked_hash_history(hashes_com_url, api_key, days, group_by=None):
     # Example input JSON:
     # {
     #     "success": true,
@@ -178,35 +291,71 @@ def display_cracked_hash_history(hashes_com_url, api_key, days):
     #     ]
     # }
     # Function that will display the last X number of days of cracked hashes.
+    # group_by can be 'algorithm', 'day' or 'week' to also print the totals per group.
     crack_history = get_cracked_hash_history(hashes_com_url, api_key)
-    # Only use the last X number of days of cracked hashes.
-    if days:
-        crack_history['list'] = [item for item in crack_history['list'] if datetime.strptime(item['date'], "%Y-%m-%d %H:%M:%S") >= datetime.now() - timedelta(days=days)]
-
-    if crack_history:
-        # Convert the BTC, XMR, and LTC values to USD using the to_usd function and add the converted values to the list item as new keys; 'btc_usd', 'xmr_usd', 'ltc_usd'.
-        for item in crack_history['list']:
-            item['btc_usd'] = to_usd(item['btc'], 'BTC')['converted']
-            item['xmr_usd'] = to_usd(item['xmr'], 'XMR')['converted']
-            item['ltc_usd'] = to_usd(item['ltc'], 'LTC')['converted']
-        # Use Pandas to Display each list item in a table format, with the following columns: Date, ID, Algorithm, Status, Total Hashes, Valid Hashes, BTC, XMR, LTC. Sort the table by Date.
-        # Example:  Date                ID      Algorithm   Status      Total Hashes    Valid Hashes    BTC             XMR     LTC
-        #           2024-09-10 21:49:28 512142  NTLM        Processed   1               2               0.0000011305    0       0.0000095
-        #           2024-10-03 10:49:58 524342  NTLM        Processed   28              49              0.0000770165    0       0.00022857
-        columns = ['date', 'status', 'algorithm', 'totalHashes', 'validHashes', 'btc', 'btc_usd', 'xmr', 'xmr_usd', 'ltc' , 'ltc_usd']
-        df = pd.DataFrame(crack_history['list'], columns=columns)
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values(by='date')
-        print(tabulate(df, headers='keys', tablefmt='psql'))
-
-        # Get the total BTC, XMR, and LTC values from the list and convert them to USD using the to_usd function.
-        total_btc = sum([float(item['btc']) for item in crack_history['list']])
-        total_xmr = sum([float(item['xmr']) for item in crack_history['list']])
-        total_ltc = sum([float(item['ltc']) for item in crack_history['list']])
-        total_btc_usd = to_usd(total_btc, 'BTC')['converted']
-        total_xmr_usd = to_usd(total_xmr, 'XMR')['converted']
-        total_ltc_usd = to_usd(total_ltc, 'LTC')['converted']
+    if not crack_history:
+        return None
+    df = load_cracked_hash_history(crack_history, days=days)
+    # Use Pandas to Display each list item in a table format, with the following columns: Date, ID, Algorithm, Status, Total Hashes, Valid Hashes, BTC, XMR, LTC. Sort the table by Date.
+    # Example:  Date                ID      Algorithm   Status      Total Hashes    Valid Hashes    BTC             XMR     LTC
+    #           2024-09-10 21:49:28 512142  NTLM        Processed   1               2               0.0000011305    0       0.0000095
+    #           2024-10-03 10:49:58 524342  NTLM        Processed   28              49              0.0000770165    0       0.00022857
+    columns = ['date', 'status', 'algorithm', 'totalHashes', 'validHashes', 'btc', 'btc_usd', 'xmr', 'xmr_usd', 'ltc' , 'ltc_usd']
+    print(tabulate(df[columns], headers='keys', tablefmt='psql'))
+
+    if group_by:
+        summary = summarize_cracked_hash_history(df, group_by)
+        if summary is not None:
+            print(tabulate(summary, headers='keys', tablefmt='psql', floatfmt='.10g'))
+
+    # Get the total BTC, XMR, and LTC values from the columns and convert them to USD using the to_usd function.
+    for currency in history_currencies:
+        total_usd = to_usd(df['%s_amount' % currency].sum(), currency.upper())['converted']
         # Print the total BTC, XMR, and LTC values in USD.
-        print("Total BTC: %s" % total_btc_usd)
-        print("Total XMR: %s" % total_xmr_usd)
-        print("Total LTC: %s" % total_ltc_usd)
\ No newline at end of file
+        print("Total %s: %s" % (currency.upper(), total_usd))
+
+# Currency columns of the cracked hash history.
+history_currencies = ('btc', 'xmr', 'ltc')
+
+def load_cracked_hash_history(crack_history, days=None):
+    # Load a get_cracked_hash_history() response into a DataFrame with typed columns, sorted by date.
+    # The original btc/xmr/ltc strings are kept for display. <currency>_amount holds them as floats,
+    # <currency>_usd_value holds the USD values, and <currency>_usd holds those formatted as "$0.000" (or "N/A" without a price).
+    # With days only the uploads of the last X days are kept.
+    columns = ['id', 'date', 'status', 'algorithm', 'algorithmId', 'totalHashes', 'validHashes', 'btc', 'xmr', 'ltc']
+    df = pd.DataFrame(crack_history['list'], columns=columns)
+    df['date'] = pd.to_datetime(df['date'], format="%Y-%m-%d %H:%M:%S", errors='coerce')
+    if days:
+        df = df[df['date'] >= pd.Timestamp(datetime.now() - timedelta(days=days))]
+    df = df.sort_values(by='date').reset_index(drop=True)
+    for column in ('totalHashes', 'validHashes'):
+        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype('int64')
+    for currency in history_currencies:
+        df['%s_amount' % currency] = pd.to_numeric(df[currency], errors='coerce').fillna(0.0)
+        usd_values = convert_to_usd(df['%s_amount' % currency].to_numpy(), currency.upper())
+        if usd_values is None:
+            df['%s_usd_value' % currency] = np.nan
+            df['%s_usd' % currency] = "N/A"
+        else:
+            df['%s_usd_value' % currency] = usd_values
+            df['%s_usd' % currency] = df['%s_usd_value' % currency].map("${0:.3f}".format)
+    return df
+
+def summarize_cracked_hash_history(df, group_by='algorithm'):
+    # Sum a load_cracked_hash_history() DataFrame per 'algorithm', 'day' or 'week' (weeks start on Monday).
+    # Returns a DataFrame with the number of uploads, the hash counts and the currency and USD sums of each group.
+    if group_by == 'algorithm':
+        key = df['algorithm']
+    elif group_by == 'day':
+        key = df['date'].dt.floor('D').rename('day')
+    elif group_by == 'week':
+        key = df['date'].dt.to_period('W-SUN').dt.start_time.rename('week')
+    else:
+        print("Error: Unknown group_by %s, use 'algorithm', 'day' or 'week'." % group_by)
+        return None
+    sums = ['totalHashes', 'validHashes']
+    for currency in history_currencies:
+        sums += ['%s_amount' % currency, '%s_usd_value' % currency]
+    summary = df.groupby(key)[sums].sum(min_count=1)
+    summary.insert(0, 'uploads', df.groupby(key).size())
+    return summary
@@ -1,7 +1,13 @@
 #!/bin/env python3
 import base64
 import requests
-import json
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import inc.common as common
+import inc.http_client as http_client
+import inc.http_cache as http_cache
 
 def submit_request_post(url, request_json_data, files, api_key=None):
     # Make a POST web request to Hashtopolis using APIv1 to submit the new hashlist wih 'Content-Type: application/json' header.
@@ -14,7 +20,7 @@ def submit_request_post(url, request_json_data, files, api_key=None):
         default_headers = requests.utils.default_headers()
         default_headers['api-key'] = api_key
         # print(json.dumps(request_json_data, indent=4))
-        response = requests.post(url, json=request_json_data, files=files, headers=default_headers)
+        response = http_client.post(url, json=request_json_data, files=files, headers=default_headers)
         if response.status_code == 200:
             return response.text
         else:
@@ -40,7 +46,7 @@ def submit_request_get(url):
     # If the request is not successful, then Hashtopolis will return a JSON object with an error message.
     # Example: {"section":"hashlist","request":"getHashlists","response":"ERROR","message":"Invalid request!"}
     try:
-        response = requests.get(url)
+        response = http_client.get(url)
         if response.status_code == 200:
             return response.text
         else:
@@ -59,6 +65,75 @@ def submit_request_get(url):
         print('Error: %s' % error_code)
         return None
 
+def submit_request_get_json(url, ttl=None):
+    # Cached version of submit_request_get() for JSON responses, returns the parsed JSON (see inc/http_cache.py).
+    # Unchanged responses are revalidated with ETag / Last-Modified and returned from the cache without decoding them again.
+    try:
+        return http_cache.get_json(url, ttl=ttl)
+    except requests.exceptions.ConnectionError as error_code:
+        print('Failed to connect to the Hashmob.net server. Error: %s' % error_code)
+        return None
+    except requests.exceptions.RequestException as error_code:
+        print('Error: %s' % error_code)
+        return None
+    except Exception as error_code:
+        print('Error: %s' % error_code)
+        return None
+
+def submit_request_get_to_file(url, output_file, block_size=1024 * 1024, progress=True):
+    # Stream a GET response to output_file in block_size blocks instead of holding it in memory as a str.
+    # A gzip Content-Encoding is decoded by requests, a response body that is itself a gzip file is decompressed here,
+    # so output_file always holds the plain lines and can be passed straight to hashlist creation.
+    # output_file is only replaced once the download is complete (see common.atomic_write()).
+    # Returns {"file": output_file, "bytes": bytes written, "lines": lines written}, or None on error.
+    try:
+        with http_client.get(url, stream=True) as response:
+            if response.status_code != 200:
+                print("Error: %s" % (response.text))
+                return None
+            decompressor = None
+            bytes_written = 0
+            lines = 0
+            last_byte = b'\n'
+            next_progress = 0
+            with common.atomic_write(output_file, 'wb') as output:
+                for block in response.iter_content(chunk_size=block_size):
+                    if not block:
+                        continue
+                    if bytes_written == 0 and decompressor is None and block[:2] == b'\x1f\x8b':
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    if decompressor:
+                        block = decompressor.decompress(block)
+                    if not block:
+                        continue
+                    output.write(block)
+                    bytes_written += len(block)
+                    lines += block.count(b'\n')
+                    last_byte = block[-1:]
+                    if progress and bytes_written >= next_progress:
+                        print('Downloaded %.1f MB, %s lines' % (bytes_written / 1048576, lines), end='\r')
+                        next_progress = bytes_written + 10 * 1024 * 1024
+                if decompressor:
+                    block = decompressor.flush()
+                    if block:
+                        output.write(block)
+                        bytes_written += len(block)
+                        lines += block.count(b'\n')
+                        last_byte = block[-1:]
+            # Count a last line without a line break as well.
+            if last_byte != b'\n':
+                lines += 1
+        if progress:
+            print('Downloaded %.1f MB, %s lines to %s' % (bytes_written / 1048576, lines, output_file))
+        return {"file": output_file, "bytes": bytes_written, "lines": lines}
+    except requests.exceptions.ConnectionError as error_code:
+        print('Failed to connect to the Hashmob.net server. Error: %s' % error_code)
+    except requests.exceptions.RequestException as error_code:
+        print('Error: %s' % error_code)
+    except (OSError, zlib.error) as error_code:
+        print('Error: %s' % error_code)
+    return None
+
 def filter_hashlists_by_hashtype(hashlists, target_hash_type_number):
     filtered_hashlists = []
     # For each hashlist, print the hashlist name and the number of found hashes
@@ -110,14 +185,18 @@ def get_user_hashlists(hashmob_url):
     #   }
     # ]
     hashmob_url = hashmob_url + '/api/v2/hashlist'
-    hashlists = json.loads(submit_request_get(hashmob_url))
+    hashlists = submit_request_get_json(hashmob_url)
+    if hashlists is None:
+        return None
     for hashlist in hashlists:
         hashlist['list_type'] = 'user'
     return hashlists
 
 def get_official_hashlists(hashmob_url):
     hashmob_url = hashmob_url + '/api/v2/hashlist/official'
-    hashlists = json.loads(submit_request_get(hashmob_url))
+    hashlists = submit_request_get_json(hashmob_url)
+    if hashlists is None:
+        return None
     # For each hashlist add the value of 'official' to the hashlist
     for hashlist in hashlists:
         hashlist['list_type'] = "official"
@@ -125,37 +204,92 @@ def get_official_hashlists(hashmob_url):
 
 def get_premium_hashlists(hashmob_url):
     hashmob_url = hashmob_url + '/api/v2/hashlist/premium'
-    hashlists = json.loads(submit_request_get(hashmob_url))
+    hashlists = submit_request_get_json(hashmob_url)
+    if hashlists is None:
+        return None
     # For each hashlist add the value of 'premium' to the hashlist
     for hashlist in hashlists:
         hashlist['list_type'] = "premium"
     return hashlists
 
-def get_all_hashlists(hashmob_url, target_hash_type_number):
-    all_hashlist_jsons = []
-    hashlist_json = get_user_hashlists(hashmob_url)
-    if hashlist_json:
-        all_hashlist_jsons.append(hashlist_json)
-    hashlist_json = get_official_hashlists(hashmob_url)
-    if hashlist_json:
-        all_hashlist_jsons.append(hashlist_json)
-    hashlist_json = get_premium_hashlists(hashmob_url)
-    if hashlist_json:
-        all_hashlist_jsons.append(hashlist_json)
-    # Filter all_hashlist_jsons by target_hash_type_number, create a list of hashlists with the target_hash_type_number.
-    target_hashlists = []
-    for hashlist_json in all_hashlist_jsons:
-        # hashlists = json.loads(hashlist_json)
-        hashlists = hashlist_json
+class HashlistCatalog:
+    # The user, official and premium HashMob hashlists, indexed by hash_type and list_type, so any number of queries are
+    # answered from one catalog fetch.
+    # Example:
+    #     catalog = fetch_catalog(hashmob_url)
+    #     catalog.get(hash_type=1000)                          # all NTLM hashlists
+    #     catalog.get(hash_type=0, list_type='official')       # official MD5 hashlists
+    # Entries without a numeric hash_type can not be indexed, they are left out and kept in .skipped.
+    def __init__(self, hashlists):
+        self.hashlists = []
+        self.skipped = []
+        self.by_hash_type = {}
+        self.by_list_type = {}
+        self.by_type_and_list_type = {}
         for hashlist in hashlists:
-            if hashlist['hash_type'] == target_hash_type_number:
-                target_hashlists.append(hashlist)
-    return target_hashlists
+            if not hashlist:
+                continue
+            try:
+                hash_type = int(hashlist['hash_type'])
+            except (KeyError, TypeError, ValueError):
+                self.skipped.append(hashlist)
+                continue
+            try:
+                hashlist['left_to_crack'] = hashlist['total_hashes'] - hashlist['found_hashes']
+            except (KeyError, TypeError):
+                hashlist['left_to_crack'] = None
+            list_type = hashlist.get('list_type')
+            self.hashlists.append(hashlist)
+            self.by_hash_type.setdefault(hash_type, []).append(hashlist)
+            self.by_list_type.setdefault(list_type, []).append(hashlist)
+            self.by_type_and_list_type.setdefault((hash_type, list_type), []).append(hashlist)
+        if self.skipped:
+            print('Skipped %s hashlists without a valid hash_type, e.g. %s' % (len(self.skipped), str(self.skipped[0])[:200]))
+
+    def __len__(self):
+        return len(self.hashlists)
+
+    def hash_types(self):
+        # Return the hash types in the catalog, sorted.
+        return sorted(self.by_hash_type)
+
+    def get(self, hash_type=None, list_type=None):
+        # Return the hashlists of a hash type and/or list type ('user', 'official' or 'premium'), all hashlists if neither is given.
+        if hash_type is None and list_type is None:
+            return list(self.hashlists)
+        if list_type is None:
+            return list(self.by_hash_type.get(int(hash_type), []))
+        if hash_type is None:
+            return list(self.by_list_type.get(list_type, []))
+        return list(self.by_type_and_list_type.get((int(hash_type), list_type), []))
+
+def fetch_catalog(hashmob_url):
+    # Fetch the user, official and premium hashlists at the same time and return them as a HashlistCatalog.
+    # A list that could not be fetched is left out of the catalog.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(get_hashlists, hashmob_url) for get_hashlists in
+                   (get_user_hashlists, get_official_hashlists, get_premium_hashlists)]
+        all_hashlist_jsons = [future.result() for future in futures]
+    hashlists = []
+    for hashlist_json in all_hashlist_jsons:
+        if hashlist_json:
+            hashlists.extend(hashlist_json)
+    return HashlistCatalog(hashlists)
+
+def get_all_hashlists(hashmob_url, target_hash_type_number):
+    # Return the user, official and premium hashlists of one hash type. To query several hash types, call fetch_catalog()
+    # once and use catalog.get(hash_type=...) for each of them.
+    return fetch_catalog(hashmob_url).get(hash_type=target_hash_type_number)
 
 def download_hashlist_left_hashes(hashmob_url, hashlistid):
     hashmob_url = "%s/api/v2/hashlist/%s/left" % (hashmob_url, hashlistid)
     return submit_request_get(hashmob_url)
 
+def download_hashlist_left_hashes_to_file(hashmob_url, hashlistid, output_file, progress=True):
+    # Streaming version of download_hashlist_left_hashes(), writes the left hashes to output_file.
+    hashmob_url = "%s/api/v2/hashlist/%s/left" % (hashmob_url, hashlistid)
+    return submit_request_get_to_file(hashmob_url, output_file, progress=progress)
+
 def submit_cracked_hashes(hashmob_url, hashmob_api_key, found_hashes, hash_type_number):
     # URL: "/api/v2/submit"
     # Submit founds for hashes
@@ -174,14 +308,105 @@ def submit_cracked_hashes(hashmob_url, hashmob_api_key, found_hashes, hash_type_
         "founds": []
     }
     # Foreach line in the found_hashes string, add the line to the request_json_data['founds'] list
+    # For large numbers of founds use submit_cracked_hashes_batched() or submit_cracked_hashes_from_file() instead.
     for line in found_hashes.splitlines():
         request_json_data['founds'].append(line)
     return submit_request_post(hashmob_url, request_json_data, None, hashmob_api_key)
 
+def iter_found_lines(file_path):
+    # Yield the non-empty lines of a founds file (hash:plain per line) without the line break.
+    with open(file_path, 'r', encoding='utf-8', errors='surrogateescape') as founds_file:
+        for line in founds_file:
+            line = line.rstrip('\r\n')
+            if line:
+                yield line
+
+def iter_found_batches(founds, batch_size=10000, max_batch_mb=8):
+    # Group an iterable of founds into lists of at most batch_size founds and about max_batch_mb MB of JSON.
+    max_batch_bytes = int(max_batch_mb * 1024 * 1024)
+    batch = []
+    batch_bytes = 0
+    for found in founds:
+        # A found costs its length plus quotes and a comma in the JSON body.
+        found_bytes = len(found) + 4
+        if batch and (len(batch) >= batch_size or batch_bytes + found_bytes > max_batch_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(found)
+        batch_bytes += found_bytes
+    if batch:
+        yield batch
+
+def submit_cracked_hashes_batched(hashmob_url, hashmob_api_key, founds, hash_type_number, batch_size=10000, max_batch_mb=8,
+                                  workers=4, retries=2, retry_delay=5):
+    # Submit founds to /api/v2/submit in size-bounded batches, with up to "workers" batches in flight at the same time.
+    # founds can be any iterable of "hash:plain" strings, e.g. iter_found_lines('founds.txt'), and is read batch by batch,
+    # so only the batches in flight are held in memory.
+    # A failed batch is retried on its own up to "retries" times, waiting retry_delay seconds longer after every attempt.
+    # Returns one result per batch, in batch order:
+    # {"index": 0, "founds": 10000, "success": True, "attempts": 1, "response": "...", "failed_founds": None}
+    # failed_founds holds the founds of a batch that still failed after all retries, so they can be submitted again later.
+    url = "%s/api/v2/submit" % hashmob_url
+    results = []
+    # Batches that were sent but not answered yet, oldest first.
+    in_flight = deque()
+
+    def send_batch(index, batch):
+        request_json_data = {
+            "algorithm": hash_type_number,
+            "founds": batch
+        }
+        attempts = 0
+        response = None
+        while attempts <= retries:
+            if attempts:
+                print('Retrying HashMob submit batch %s (attempt %s of %s).' % (index, attempts + 1, retries + 1))
+                time.sleep(retry_delay * attempts)
+            attempts += 1
+            response = submit_request_post(url, request_json_data, None, hashmob_api_key)
+            if response is not None:
+                break
+        return {
+            "index": index,
+            "founds": len(batch),
+            "success": response is not None,
+            "attempts": attempts,
+            "response": response,
+            "failed_founds": None if response is not None else batch
+        }
+
+    def collect_oldest_batch():
+        result = in_flight.popleft().result()
+        results.append(result)
+        print('HashMob submit batch %s: %s founds, %s.' % (result['index'], result['founds'], 'OK' if result['success'] else 'FAILED'))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for index, batch in enumerate(iter_found_batches(founds, batch_size, max_batch_mb)):
+            while len(in_flight) >= workers:
+                collect_oldest_batch()
+            in_flight.append(executor.submit(send_batch, index, batch))
+        while in_flight:
+            collect_oldest_batch()
+    failed = [result for result in results if not result['success']]
+    if failed:
+        print('Error: %s of %s HashMob submit batches failed (%s founds).' % (len(failed), len(results), sum(result['founds'] for result in failed)))
+    return results
+
+def submit_cracked_hashes_from_file(hashmob_url, hashmob_api_key, file_path, hash_type_number, batch_size=10000, workers=4, retries=2):
+    # Submit the founds of a hash:plain file with submit_cracked_hashes_batched().
+    return submit_cracked_hashes_batched(hashmob_url, hashmob_api_key, iter_found_lines(file_path), hash_type_number,
+                                         batch_size=batch_size, workers=workers, retries=retries)
+
 def download_found_hashes(hashmob_url, hashlistid, hash_type_number):
     hashmob_url = "%s/api/v2/hashlist/%s/found/%s" % (hashmob_url, hashlistid, hash_type_number)
     return submit_request_get(hashmob_url)
 
+def download_found_hashes_to_file(hashmob_url, hashlistid, hash_type_number, output_file, progress=True):
+    # Streaming version of download_found_hashes(), writes the found hashes to output_file.
+    hashmob_url = "%s/api/v2/hashlist/%s/found/%s" % (hashmob_url, hashlistid, hash_type_number)
+    return submit_request_get_to_file(hashmob_url, output_file, progress=progress)
+
 def get_hashlist_details(hashmob_url, hashlistid):
     hashmob_url = "%s/api/v2/hashlist/%s" % (hashmob_url, hashlistid)
     return submit_request_get(hashmob_url)
\ No newline at end of file
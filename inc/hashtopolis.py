@@ -3,8 +3,58 @@ import base64
 import requests
 import json
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import inc.algorithms as algorithms
+import inc.http_client as http_client
+import inc.json_stream as json_stream
+import inc.wordlist as wordlist
+import inc.harvest_state as harvest_state
+import inc.import_pipeline as import_pipeline
+import inc.hash_validation as hash_validation
+import inc.hash_classifier as hash_classifier
+
+# Number of worker threads used by submit_batch() when no workers value is given.
+batch_workers = 8
+
+# Seconds a cached server config value is used before it is fetched from the server again.
+server_config_cache_ttl = 300
+# Config items fetched in one batch when listConfig does not return the config values.
+prefetch_config_items = ('maxHashlistSize', 'hashcatBrainEnable', 'chunktime', 'statustimer')
+# Process-wide server config cache: {htserver: {"loaded": timestamp, "items": {configItem: (value, timestamp)}}}
+_server_config_cache = {}
+_server_config_lock = threading.Lock()
+
+# Seconds list responses are cached, per API section. Sections that are not listed or have a TTL of 0 are never cached.
+# Cached responses are shared between callers, so treat returned list responses as read-only.
+response_cache_ttl = {
+    "hashlist": 30,
+    "superhashlist": 30,
+    "task": 15,
+    "file": 60,
+    "agent": 30,
+    "supertask": 120
+}
+# Read-only requests whose responses are cached.
+cacheable_requests = ('listHashlists', 'listSuperhashlists', 'listTasks', 'listSubtasks', 'listFiles', 'listAgents', 'listSupertasks')
+# Every successful request that is not a get*/list* request drops the cached responses of its own section.
+# Requests that also change other sections list those sections here.
+cache_invalidates = {
+    "createHashlist": ("superhashlist",),
+    "deleteHashlist": ("superhashlist", "task"),
+    "createSuperhashlist": ("hashlist",),
+    "deleteSuperhashlist": ("hashlist", "task"),
+    "exportLeft": ("file",),
+    "generateWordlist": ("file",),
+    "deletePretask": ("supertask",),
+    "runSupertask": ("supertask",)
+}
+# {(htserver, section, request, request JSON): (response, timestamp)}
+_response_cache = {}
+_response_cache_lock = threading.Lock()
 
 def submit_request(htserver, request_json_data):
     # Make a POST web request to Hashtopolis using APIv1 to submit the new hashlist wih 'Content-Type: application/json' header.
@@ -12,15 +62,68 @@ def submit_request(htserver, request_json_data):
     # Example: {"section":"hashlist","request":"createHashlist","response":"OK","hashlistId":198}
     # If the request is not successful, then Hashtopolis will return a JSON object with an error message.
     # Example: {"section":"hashlist","request":"createHashlist","response":"ERROR","message":"Invalid hashlist format!"}
+    response, error = submit_request_with_error(htserver, request_json_data)
+    return response
+
+def submit_request_with_error(htserver, request_json_data):
+    # Same as submit_request, but returns a (response, error) tuple so callers can tell why a request failed.
+    # On success error is None, on failure response is None and error is the error message.
+    # List requests are answered from the response cache when possible, and successful mutating requests drop the
+    # cached responses of the sections they change. See response_cache_ttl and cache_invalidates.
+    section = request_json_data.get('section')
+    request_name = request_json_data.get('request')
+    cache_key = None
+    if request_name in cacheable_requests and response_cache_ttl.get(section):
+        cache_key = (htserver, section, request_name, json.dumps(request_json_data, sort_keys=True))
+        response = _get_cached_response(cache_key, response_cache_ttl[section])
+        if response is not None:
+            return response, None
+    response, error = _send_request(htserver, request_json_data)
+    if error is None:
+        if cache_key:
+            _set_cached_response(cache_key, response)
+        elif not request_name.startswith(('get', 'list')):
+            invalidate_response_cache(htserver, (section,) + cache_invalidates.get(request_name, ()))
+    return response, error
+
+def invalidate_response_cache(htserver=None, sections=None):
+    # Drop cached list responses. With no arguments the whole cache is cleared, otherwise only the responses of the
+    # given server and/or sections.
+    with _response_cache_lock:
+        for cache_key in list(_response_cache):
+            if htserver is not None and cache_key[0] != htserver:
+                continue
+            if sections is not None and cache_key[1] not in sections:
+                continue
+            del _response_cache[cache_key]
+
+def _get_cached_response(cache_key, ttl):
+    with _response_cache_lock:
+        cached = _response_cache.get(cache_key)
+        if cached and time.monotonic() - cached[1] < ttl:
+            return cached[0]
+    return None
+
+def _set_cached_response(cache_key, response):
+    with _response_cache_lock:
+        _response_cache[cache_key] = (response, time.monotonic())
+
+def _send_request(htserver, request_json_data):
     request_json_data = json.dumps(request_json_data)
     ht_api_url = htserver + '/api/user.php'
     try:
-        request = requests.post(ht_api_url, data=request_json_data, headers={'Content-Type': 'application/json'})
+        request = http_client.post(ht_api_url, data=request_json_data, headers={'Content-Type': 'application/json'})
     except requests.exceptions.ConnectionError as error_code:
         print('Failed to connect to the Hashtopolis server. Error: %s' % error_code)
-        return
+        return None, 'Failed to connect to the Hashtopolis server. Error: %s' % error_code
+    except requests.exceptions.Timeout as error_code:
+        print('The Hashtopolis server did not respond in time. Error: %s' % error_code)
+        return None, 'The Hashtopolis server did not respond in time. Error: %s' % error_code
+    except requests.exceptions.RequestException as error_code:
+        print('The request to the Hashtopolis server failed. Error: %s' % error_code)
+        return None, 'The request to the Hashtopolis server failed. Error: %s' % error_code
     if request.status_code == 200 and 'OK' in request.text:
-        return json.loads(request.text)
+        return json.loads(request.text), None
     if request.status_code != 200 or 'OK' not in request.text:
         # Set the error log name with the current epoch timestamp
         error_log_name = 'hashtopolis_submit_request_error_log_%s.txt' % (datetime.now().timestamp())
@@ -37,10 +140,58 @@ def submit_request(htserver, request_json_data):
         error_data += '\n ErrorText   : %s' % (str(request.text))
         error_data += '\n ErrorLog    : %s' % (error_log_name)
         print(error_data)
-        return None
+        # Use the message Hashtopolis sent back if there is one, otherwise the HTTP status code.
+        try:
+            error_message = json.loads(request.text)['message']
+        except (ValueError, KeyError, TypeError):
+            error_message = 'HTTP status %s' % request.status_code
+        return None, error_message
+
+def submit_batch(htserver, request_json_data_list, workers=None, stop_on_error=False, progress=True):
+    # Run a list of request JSON objects over a pool of worker threads.
+    # Returns one result per request, in the same order as request_json_data_list:
+    # {"index": 0, "success": True, "response": {...}, "error": None}
+    # If stop_on_error is True, no new requests are started after the first error. Requests that were never sent are
+    # returned with "success": False and "error": "Skipped".
+    # progress can be True to print the progress, False for no output, or a function that is called with
+    # (done, total, errors) after every finished request.
+    if workers is None:
+        workers = batch_workers
+    total = len(request_json_data_list)
+    results = [None] * total
+    done = 0
+    errors = 0
+    stop_event = threading.Event()
+
+    def run_request(index, request_json_data):
+        if stop_event.is_set():
+            return index, None, 'Skipped'
+        response, error = submit_request_with_error(htserver, request_json_data)
+        if error is not None and stop_on_error:
+            stop_event.set()
+        return index, response, error
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(run_request, index, request_json_data) for index, request_json_data in enumerate(request_json_data_list)]
+        for future in as_completed(futures):
+            index, response, error = future.result()
+            results[index] = {"index": index, "success": error is None, "response": response, "error": error}
+            done += 1
+            if error is not None:
+                errors += 1
+            if callable(progress):
+                progress(done, total, errors)
+            elif progress:
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                print('%s ::: Batch: %s/%s - Errors: %s' % (timestamp, done, total, errors), flush=True, end="\r")
+    if progress is True and total:
+        print()
+    return results
 
 def create_new_hashlist(htserver, accesskey, hashliststring, hashisSecret, hashlist_name, hashtype,
-                        isSalted=False, isHexSalt=False, separator=':', format=0):
+                        isSalted=False, isHexSalt=False, separator=':', format=0, validate=False):
+    # With validate=True, lines that do not match the format of the hash type (see inc/hash_validation.py) are dropped
+    # before the hashlist is uploaded.
     # Create a JSON object with all the required information.
     # Example submit new Hashlist JSON.
     # {
@@ -63,6 +214,14 @@ def create_new_hashlist(htserver, accesskey, hashliststring, hashisSecret, hashl
     # Trying to get 'notes' to work, but not so far.
     # notes='',
 
+    if validate:
+        validator = hash_validation.get_validator(hashtype, separator=separator)
+        if validator:
+            valid_lines, invalid_lines = validator.filter_chunk(str(hashliststring).encode())
+            hashliststring = valid_lines.decode(errors='surrogateescape')
+            if invalid_lines:
+                print('Dropped %s lines that are not valid %s hashes.' % (invalid_lines, hashtype))
+
     # Check if the hashliststring is longer than "maxHashlistSize" lines limit.
     # Use the get_server_config function to get the "maxHashlistSize" value from the server.
     maxHashlistSize = int(get_server_config(htserver, accesskey, 'maxHashlistSize'))
@@ -70,19 +229,26 @@ def create_new_hashlist(htserver, accesskey, hashliststring, hashisSecret, hashl
     size = hashliststring.count('\n')
     # print(size)
     if size > maxHashlistSize:
-        print('The hashlist is too large. The maximum size is %s lines.' % maxHashlistSize)
+        print('The hashlist is too large. The maximum size is %s lines. Use create_new_hashlist_from_file() to split it.' % maxHashlistSize)
         return None
     # Encode the hash variable to base64.
     hashliststring = str(hashliststring)
-    hash = base64.b64encode(hashliststring.encode()).decode()
+    hash = base64.b64encode(hashliststring.encode(errors='surrogateescape')).decode()
+
+    request_json_data = create_new_hashlist_request_data(htserver, accesskey, hash, hashisSecret, hashlist_name, hashtype,
+                                                         isSalted, isHexSalt, separator, format)
+    return submit_request(htserver, request_json_data)
 
+def create_new_hashlist_request_data(htserver, accesskey, data, hashisSecret, hashlist_name, hashtype,
+                                     isSalted=False, isHexSalt=False, separator=':', format=0):
+    # Build the createHashlist request for already base64 encoded hashlist data. See create_new_hashlist() for an example.
     # Get the server configuration values for hashcat brain.
     hashcatBrainEnabled = get_server_config(htserver, accesskey, 'hashcatBrainEnable')
     useBrain = False
     # If hashcatBrainEnabled is 1 (enabled), and useBrain is True, then set useBrain to 'true'.
     if hashcatBrainEnabled:
-        # Check if the "hashtype" number is in the algorithms.slowalgs list.
-        if int(hashtype) in algorithms.slowalgs:
+        # Only use the brain for hash types the algorithm registry marks as brain eligible (slow hashes).
+        if algorithms.brain_eligible(hashtype):
             useBrain = True
 
     request_json_data = {
@@ -91,18 +257,120 @@ def create_new_hashlist(htserver, accesskey, hashliststring, hashisSecret, hashl
     "name": "%s" % hashlist_name,
     "isSalted": isSalted,
     "isSecret": hashisSecret,
-    "isHexSalt": False,
-    "separator": ":",
-    "format": 0,
+    "isHexSalt": isHexSalt,
+    "separator": separator,
+    "format": format,
     "hashtypeId": hashtype,
     "accessGroupId": 1,
-    "data": "%s" % hash,
+    "data": "%s" % data,
     "useBrain": useBrain,
     "brainFeatures":  3,
     # "notes": str(notes),
     'accessKey': "%s" % accesskey
     }
-    return submit_request(htserver, request_json_data)
+    return request_json_data
+
+def create_new_hashlist_from_file(htserver, accesskey, file_path, hashisSecret, hashlist_name, hashtype,
+                                  isSalted=False, isHexSalt=False, separator=':', format=0, workers=4, max_part_mb=None, validate=False):
+    # Create hashlists from a hash file of any size without loading it into memory.
+    # The file is split into parts of at most "maxHashlistSize" lines (and at most max_part_mb MB, to stay under the
+    # server's upload limit), and up to "workers" parts are created at the same time. If the file needed more than one
+    # part, a superhashlist named hashlist_name is created over all parts, so tasks can run against it as one list.
+    # With validate=True, lines that do not match the format of the hash type are dropped from each part before upload.
+    # Returns {"hashlistIds": [...], "failedParts": [...], "invalidLines": ..., "superhashlist": createSuperhashlist response or None},
+    # or None if the file could not be read.
+    # Example:
+    #     create_new_hashlist_from_file(htserver, accesskey, 'left_1000.txt', False, 'Hashes.com MD5', 0)
+    maxHashlistSize = int(get_server_config(htserver, accesskey, 'maxHashlistSize'))
+    max_part_bytes = int(max_part_mb * 1024 * 1024) if max_part_mb else None
+    result = {"hashlistIds": [], "failedParts": [], "invalidLines": 0, "superhashlist": None}
+    validator = hash_validation.get_validator(hashtype, separator=separator) if validate else None
+    # Parts that were sent but not answered yet, oldest first: (part number, future).
+    in_flight = deque()
+
+    def send_part(name, data):
+        # Runs on the worker pool, so the base64 encoding of the parts is spread over the workers as well.
+        encoded = base64.b64encode(data).decode('ascii')
+        request_json_data = create_new_hashlist_request_data(htserver, accesskey, encoded, hashisSecret, name, hashtype,
+                                                             isSalted, isHexSalt, separator, format)
+        return submit_request(htserver, request_json_data)
+
+    def queue_part(part_number, name, data):
+        # Keep at most "workers" parts in memory.
+        while len(in_flight) >= workers:
+            collect_oldest_part()
+        in_flight.append((part_number, executor.submit(send_part, name, data)))
+
+    def collect_oldest_part():
+        part_number, future = in_flight.popleft()
+        response = future.result()
+        if response and 'hashlistId' in response:
+            result['hashlistIds'].append(response['hashlistId'])
+            print('Created hashlist %s for part %s of %s.' % (response['hashlistId'], part_number, file_path))
+        else:
+            result['failedParts'].append(part_number)
+            print('Error: Could not create part %s of %s.' % (part_number, file_path))
+
+    try:
+        chunker = import_pipeline.FileChunker(file_path)
+    except OSError as error:
+        print('Error: Could not open %s: %s' % (file_path, error))
+        return None
+    with chunker, ThreadPoolExecutor(max_workers=workers) as executor:
+        part_number = 0
+        # The first part is held back until the next one is read. A file that fits in one part is created as a single
+        # hashlist named hashlist_name, the parts of a larger file are named "<hashlist_name> (part N)".
+        first_part = None
+        while True:
+            chunk = chunker.next_lines(maxHashlistSize, max_part_bytes)
+            if chunk is None:
+                break
+            with chunk as data:
+                # The chunk is a view of the memory map, copy it so the worker still has it after the view is released.
+                data = bytes(data)
+            if validator:
+                data, invalid_lines = validator.filter_chunk(data)
+                result['invalidLines'] += invalid_lines
+            if not data.strip():
+                continue
+            part_number += 1
+            if part_number == 1:
+                first_part = data
+                continue
+            if first_part is not None:
+                queue_part(1, '%s (part 1)' % hashlist_name, first_part)
+                first_part = None
+            queue_part(part_number, '%s (part %s)' % (hashlist_name, part_number), data)
+        if first_part is not None:
+            queue_part(1, hashlist_name, first_part)
+        while in_flight:
+            collect_oldest_part()
+
+    if result['invalidLines']:
+        print('Dropped %s lines of %s that are not valid %s hashes.' % (result['invalidLines'], file_path, hashtype))
+    if result['failedParts']:
+        print('Error: %s parts of %s could not be created, no superhashlist was created. Created hashlists: %s' % (
+            len(result['failedParts']), file_path, result['hashlistIds']))
+    elif len(result['hashlistIds']) > 1:
+        result['superhashlist'] = create_superhashlist(htserver, accesskey, result['hashlistIds'], hashlist_name)
+    return result
+
+def create_new_hashlists_from_mixed_file(htserver, accesskey, file_path, hashisSecret, hashlist_name, output_dir=None,
+                                         priority=hash_classifier.default_priority, workers=4):
+    # Sort the lines of a file with mixed hash types into one file per hash type (see inc/hash_classifier.py), and create
+    # a hashlist for each type with create_new_hashlist_from_file(). The hashlists are named "<hashlist_name> <algorithm name>".
+    # Lines without a known format are left in "<file name>.unknown.txt" and not uploaded.
+    # Returns {"classification": classify_file() result, "hashlists": {hashtype (str): create_new_hashlist_from_file() result}}.
+    classification = hash_classifier.classify_file(file_path, output_dir=output_dir, priority=priority)
+    if classification['unknown']['lines']:
+        print('%s lines of %s have no known hash format, see %s' % (
+            classification['unknown']['lines'], file_path, classification['unknown']['file']))
+    hashlists = {}
+    for hashtype, bucket in classification['buckets'].items():
+        print('Creating hashlist for %s lines of %s (%s), candidates: %s' % (bucket['lines'], bucket['name'], hashtype, bucket['candidates']))
+        hashlists[hashtype] = create_new_hashlist_from_file(htserver, accesskey, bucket['file'], hashisSecret,
+                                                            '%s %s' % (hashlist_name, bucket['name']), int(hashtype), workers=workers)
+    return {"classification": classification, "hashlists": hashlists}
 
 def create_prince_task(htserver, accesskey, hashlistId):
     # createTask
@@ -418,6 +686,16 @@ def get_server_config(htserver, accessKey, configItem):
     # "configType": "string",
     # "value": "#HL#"
     # }
+    # Values are served from the process-wide config cache while they are younger than server_config_cache_ttl seconds.
+    # The first lookup for a server fills the cache for all config items at once, see load_server_config.
+    value, found = _get_cached_server_config(htserver, configItem)
+    if found:
+        return value
+    if not _server_config_loaded(htserver):
+        load_server_config(htserver, accessKey)
+        value, found = _get_cached_server_config(htserver, configItem)
+        if found:
+            return value
     request_json_data = {
     "section": "config",
     "request": "getConfig",
@@ -425,10 +703,73 @@ def get_server_config(htserver, accessKey, configItem):
     "accessKey": accessKey
     }
     config = submit_request(htserver, request_json_data)
-    # If config is not empty, return the value of the config item.
+    # If config is not empty, cache and return the value of the config item.
     if config:
+        _set_cached_server_config(htserver, {configItem: config['value']})
         return config['value']
 
+def load_server_config(htserver, accessKey):
+    # Fill the config cache for a server with a single listConfig request.
+    # Hashtopolis versions that do not include the values in the listConfig response only return the item names. In that case
+    # the items in prefetch_config_items are fetched with getConfig in one concurrent batch instead, so the cache still
+    # holds every value this module uses after one round of requests.
+    config_values = {}
+    config_list = list_server_config(htserver, accessKey)
+    if config_list:
+        for item in config_list.get('items', []):
+            if 'value' in item:
+                config_values[item['item']] = item['value']
+    if not config_values:
+        request_json_data_list = []
+        for configItem in prefetch_config_items:
+            request_json_data = {
+            "section": "config",
+            "request": "getConfig",
+            "configItem": configItem,
+            "accessKey": accessKey
+            }
+            request_json_data_list.append(request_json_data)
+        for result in submit_batch(htserver, request_json_data_list, progress=False):
+            if result['success']:
+                config_values[result['response']['item']] = result['response']['value']
+    with _server_config_lock:
+        _server_config_cache[htserver] = {"loaded": time.monotonic(), "items": {}}
+    _set_cached_server_config(htserver, config_values)
+    return config_values
+
+def invalidate_server_config(htserver=None, configItem=None):
+    # Drop cached config values. With no arguments the whole cache is cleared, with only htserver all values of that server
+    # are dropped, and with both only that one item is dropped.
+    with _server_config_lock:
+        if htserver is None:
+            _server_config_cache.clear()
+        elif configItem is None:
+            _server_config_cache.pop(htserver, None)
+        elif htserver in _server_config_cache:
+            _server_config_cache[htserver]['items'].pop(configItem, None)
+
+def _server_config_loaded(htserver):
+    with _server_config_lock:
+        server_cache = _server_config_cache.get(htserver)
+        return server_cache is not None and time.monotonic() - server_cache['loaded'] < server_config_cache_ttl
+
+def _get_cached_server_config(htserver, configItem):
+    # Returns a (value, found) tuple, found is False if the item is not cached or has expired.
+    with _server_config_lock:
+        server_cache = _server_config_cache.get(htserver)
+        if server_cache and configItem in server_cache['items']:
+            value, cached_at = server_cache['items'][configItem]
+            if time.monotonic() - cached_at < server_config_cache_ttl:
+                return value, True
+    return None, False
+
+def _set_cached_server_config(htserver, config_values):
+    now = time.monotonic()
+    with _server_config_lock:
+        server_cache = _server_config_cache.setdefault(htserver, {"loaded": now, "items": {}})
+        for configItem, value in config_values.items():
+            server_cache['items'][configItem] = (value, now)
+
 def get_cracker_version(htserver, accessKey):
     # getCracker
     # Get detailed informations of cracker, especially all available versions.
@@ -526,9 +867,10 @@ def get_all_hashlists(htserver, accessKey):
     # This function will return all active and archived hashlists.
     hashlists = get_active_hashlists(htserver, accessKey)
     archived_hashlists = get_archived_hashlists(htserver, accessKey)
-    if archived_hashlists:
+    if hashlists and archived_hashlists:
         # Add all values from the archived_hashlists "hashlists" to the hashlists "hashlists".
-        hashlists['hashlists'] += archived_hashlists['hashlists']
+        # Build a new object, the list responses may be shared with the response cache.
+        hashlists = dict(hashlists, hashlists=hashlists['hashlists'] + archived_hashlists['hashlists'])
     return hashlists
 
 def get_a_file(htserver, accessKey, fileId):
@@ -559,18 +901,109 @@ def get_a_file(htserver, accessKey, fileId):
     "accessKey": accessKey
     }
     file_data = submit_request(htserver, request_json_data)
+    if not file_data:
+        return
     # Use the returned URL to get just the contents of the file and store it in a variable.
     file_url = htserver + '/' + file_data['url']
     try:
-        request = requests.get(file_url)
+        request = http_client.get(file_url)
     except requests.exceptions.ConnectionError as error_code:
         print('Failed to connect to the Hashtopolis server. Error: %s' % error_code)
         return
+    except requests.exceptions.RequestException as error_code:
+        print('Failed to download the file from the Hashtopolis server. Error: %s' % error_code)
+        return
     if request.status_code == 200:
         return request.text
     if request.status_code != 200:
         print('Error: %s' % request.text)
 
+def iter_a_file_lines(htserver, accessKey, fileId, block_size=1024 * 1024, status=None):
+    # Streaming version of get_a_file. Yields the lines of the file as bytes (without line breaks) while it downloads,
+    # instead of returning the whole file as one string.
+    # Errors are printed and end the generator early. If a status dict is given, status['complete'] is set to True once
+    # the whole file was downloaded, so a failed or cut off download can be told apart from an empty file.
+    if status is not None:
+        status['complete'] = False
+    request_json_data = {
+    "section": "file",
+    "request": "getFile",
+    "fileId": fileId,
+    "accessKey": accessKey
+    }
+    file_data = submit_request(htserver, request_json_data)
+    if not file_data:
+        return
+    file_url = htserver + '/' + file_data['url']
+    try:
+        with http_client.get(file_url, stream=True) as request:
+            if request.status_code != 200:
+                print('Error: %s' % request.text)
+                return
+            for line in request.iter_lines(chunk_size=block_size):
+                yield line.rstrip(b'\r')
+        if status is not None:
+            status['complete'] = True
+    except requests.exceptions.ConnectionError as error_code:
+        print('Failed to connect to the Hashtopolis server. Error: %s' % error_code)
+    except requests.exceptions.RequestException as error_code:
+        print('Failed to download the file from the Hashtopolis server. Error: %s' % error_code)
+
+def get_left_hash_filter(htserver, accesskey, hashlistId, cleanup=True):
+    # Build an import_pipeline.LeftHashFilter with the hashes of a hashlist that are not cracked yet.
+    # The left list is generated with exportLeft and streamed with getFile. With cleanup the generated left list file is
+    # deleted from the server again after a complete download.
+    # Returns None if the left list could not be exported or downloaded completely. A filter built from a partial list
+    # would drop lines the server still needs, only a complete but empty left list drops every line.
+    exported = export_left_hashes(htserver, accesskey, hashlistId)
+    if not exported:
+        return None
+    status = {}
+    left_filter = import_pipeline.LeftHashFilter(iter_a_file_lines(htserver, accesskey, exported['fileId'], status=status))
+    if not status['complete']:
+        print('Could not download the left hashes of hashlist %s, the left list is kept as file %s on the server.' % (hashlistId, exported['fileId']))
+        return None
+    if cleanup:
+        delete_file(htserver, accesskey, exported['fileId'])
+    return left_filter
+
+def get_hashlist(htserver, accesskey, hashlistId):
+    # getHashlist
+    # Get the details of a hashlist, including the number of cracked hashes.
+    # {
+    # "section": "hashlist",
+    # "request": "getHashlist",
+    # "hashlistId": 5,
+    # "accessKey": "mykey"
+    # }
+    # {
+    # "section": "hashlist",
+    # "request": "getHashlist",
+    # "response": "OK",
+    # "hashlistId": 5,
+    # "hashtypeId": 0,
+    # "name": "Hashcat Example",
+    # "format": 0,
+    # "hashCount": 6494,
+    # "cracked": 1520,
+    # "accessGroupId": 1,
+    # "isHexSalt": false,
+    # "isSalted": false,
+    # "isSecret": false,
+    # "saltSeparator": ":",
+    # "notes": "",
+    # "useBrain": false,
+    # "brainFeatures": 0,
+    # "isArchived": false
+    # }
+    request_json_data = {
+    "section": "hashlist",
+    "request": "getHashlist",
+    "hashlistId": hashlistId,
+    "accessKey": accesskey
+    }
+    return submit_request(htserver, request_json_data)
+
 def get_cracked_hashes(htserver, accesskey, hashlistId):
     # getCracked
     # Retrieve all cracked hashes of a given hashlist.
@@ -605,6 +1038,53 @@ def get_cracked_hashes(htserver, accesskey, hashlistId):
     }
     return submit_request(htserver, request_json_data)
 
+def iter_cracked_hashes(htserver, accesskey, hashlistId, status=None):
+    # Streaming version of get_cracked_hashes for very large hashlists.
+    # The getCracked response body is read in blocks and parsed incrementally, and one (hash, plain, crackpos) tuple is
+    # yielded per cracked hash, so memory use stays flat no matter how many hashes are cracked.
+    # status is passed on to submit_request_stream(), status['complete'] tells if all cracked hashes were received.
+    # Example:
+    #     status = {}
+    #     for hash, plain, crackpos in iter_cracked_hashes(htserver, accesskey, 5, status=status):
+    #         print(plain)
+    #     if not status['complete']:
+    #         print('The cracked hashes are incomplete.')
+    request_json_data = {
+    "section": "hashlist",
+    "request": "getCracked",
+    "hashlistId": hashlistId,
+    "accessKey": accesskey
+    }
+    for cracked_hash in submit_request_stream(htserver, request_json_data, 'cracked', status=status):
+        yield cracked_hash['hash'], cracked_hash['plain'], cracked_hash['crackpos']
+
+def submit_request_stream(htserver, request_json_data, array_key, block_size=65536, status=None):
+    # Like submit_request, but yields the items of the "array_key" array of the response one at a time instead of
+    # decoding the whole response. Errors are printed and end the generator early, like submit_request returning None.
+    # If a status dict is given, status['complete'] is set to True once the whole array was read. It stays False when
+    # the generator ended early because of an error, e.g. a connection that dropped in the middle of the response.
+    if status is not None:
+        status['complete'] = False
+    ht_api_url = htserver + '/api/user.php'
+    try:
+        with http_client.post(ht_api_url, data=json.dumps(request_json_data), headers={'Content-Type': 'application/json'}, stream=True) as request:
+            if request.status_code != 200:
+                print('Error: %s' % request.text)
+                return
+            try:
+                yield from json_stream.iter_array_items(request.iter_content(chunk_size=block_size), array_key)
+            except json_stream.JSONStreamError as error_code:
+                print('Error: %s Response: %s' % (error_code, error_code.header[:1000]))
+                return
+            if status is not None:
+                status['complete'] = True
+    except requests.exceptions.ConnectionError as error_code:
+        print('Failed to connect to the Hashtopolis server. Error: %s' % error_code)
+    except requests.exceptions.Timeout as error_code:
+        print('The Hashtopolis server did not respond in time. Error: %s' % error_code)
+    except requests.exceptions.RequestException as error_code:
+        print('The response of the Hashtopolis server was interrupted. Error: %s' % error_code)
+
 def get_task(htserver, accesskey, taskId):
     # getTask
     # Get the details for a specific task. Note that this request can only be done with tasks or subtasks, but not with supertasks.
@@ -877,25 +1357,134 @@ def get_preconfigured_supertasks(htserver, accesskey, supertaskId):
     request = submit_request(htserver, request_json_data)
     print(json.dumps(request, indent=4))
 
-def get_all_known_plaintext_passwords(htserver, accesskey):
-    # Get all known hashlists.
+def get_all_known_plaintext_passwords(htserver, accesskey, workers=4):
+    # Get the sorted, de-duplicated plaintext passwords of all known hashlists as a list.
+    # The plaintexts are returned as they are (also the ones with line breaks), so the whole list is kept in memory.
+    # For very large farms use write_all_known_plaintext_passwords instead, which never holds the full list in memory.
+    # Returns None if the hashlists could not be listed or the cracked hashes of a hashlist could not be downloaded completely.
+    collector = wordlist.PlaintextCollector(memory_budget_mb=None, hex_encode=False)
+    failed = []
+    if collect_known_plaintext_passwords(htserver, accesskey, workers=workers, collector=collector, failed=failed) is None:
+        return None
+    try:
+        if failed:
+            print('Error: The cracked hashes of hashlists %s could not be downloaded completely.' % ', '.join(str(hashlistId) for hashlistId in failed))
+            return None
+        return list(collector.iter_sorted())
+    finally:
+        collector.cleanup()
+
+def write_all_known_plaintext_passwords(htserver, accesskey, output_file, workers=4, memory_budget_mb=512, temp_dir=None):
+    # Write the sorted, de-duplicated plaintext passwords of all known hashlists straight to a wordlist file.
+    # Cracked hashes are streamed from several hashlists at once, and plaintexts are spilled to sorted temporary files
+    # whenever they use more than memory_budget_mb, then merged into output_file.
+    # Returns the number of plaintext passwords written, or None if the hashlists could not be listed or the cracked hashes
+    # of a hashlist could not be downloaded completely. An existing output_file is left as it is in that case.
+    failed = []
+    collector = collect_known_plaintext_passwords(htserver, accesskey, workers=workers, memory_budget_mb=memory_budget_mb, temp_dir=temp_dir, failed=failed)
+    if collector is None:
+        return None
+    try:
+        if failed:
+            print('Error: The cracked hashes of hashlists %s could not be downloaded completely, %s was not written.' % (
+                ', '.join(str(hashlistId) for hashlistId in failed), output_file))
+            return None
+        return collector.write(output_file)
+    finally:
+        collector.cleanup()
+
+def update_known_plaintext_passwords(htserver, accesskey, output_file, state_file=None, workers=4, memory_budget_mb=512, temp_dir=None):
+    # Incremental version of write_all_known_plaintext_passwords.
+    # A local state file (output_file + '.state.json' by default) records the cracked count of every hashlist at the
+    # time it was harvested. Only hashlists whose cracked count changed since the last run are downloaded again, and their
+    # plaintexts are merged into the existing output_file. Without a state file or output file this is a full harvest.
+    # "failed" lists the changed hashlists that could not be downloaded completely, they are tried again next run.
+    # Returns a summary, e.g. {"hashlists": 500, "changed": 3, "plains": 1250342, "failed": []}, or None if the hashlists could not be listed.
+    if state_file is None:
+        state_file = output_file + '.state.json'
+    state = harvest_state.load_state(state_file)
+    if not os.path.exists(output_file):
+        # Without the previous output the watermarks are meaningless, start over.
+        state = {"servers": {}}
     hashlists = get_all_hashlists(htserver, accesskey)
+    if not hashlists:
+        return None
 
-    # Foreach hashlist, use the get_cracked_hashes function to get the cracked hashes for each hashlist and
-    # store the plaintext passwords in a list.
-    plaintext_passwords = []
+    # Get the current cracked count of every hashlist in one concurrent batch.
+    request_json_data_list = []
     for hashlist in hashlists['hashlists']:
-        cracked_hashes = get_cracked_hashes(htserver, accesskey, hashlist['hashlistId'])
-        for hash in cracked_hashes['cracked']:
-            plaintext_passwords.append(hash['plain'])
-
-    # Sort and remove duplicates from the list of plaintext passwords.
-    plaintext_passwords = sorted(list(set(plaintext_passwords)))
-
-    # Remove any empty strings from the list of plaintext passwords.
-    plaintext_passwords = [x for x in plaintext_passwords if x]
-
-    return plaintext_passwords
+        request_json_data = {
+        "section": "hashlist",
+        "request": "getHashlist",
+        "hashlistId": hashlist['hashlistId'],
+        "accessKey": accesskey
+        }
+        request_json_data_list.append(request_json_data)
+    cracked_counts = {}
+    for result in submit_batch(htserver, request_json_data_list, workers=workers, progress=False):
+        if result['success']:
+            cracked_counts[result['response']['hashlistId']] = int(result['response']['cracked'])
+    changed = harvest_state.changed_hashlists(state, htserver, cracked_counts)
+    summary = {"hashlists": len(cracked_counts), "changed": len(changed), "plains": None, "failed": []}
+    if not changed:
+        return summary
+
+    harvested_counts = {}
+    failed = []
+    collector = collect_known_plaintext_passwords(htserver, accesskey, hashlistIds=changed, workers=workers,
+                                                  memory_budget_mb=memory_budget_mb, temp_dir=temp_dir, counts=harvested_counts, failed=failed)
+    try:
+        # The plaintexts of incomplete hashlists are still merged in, the existing wordlist is only ever extended.
+        merge_with = output_file if os.path.exists(output_file) else None
+        summary['plains'] = collector.write(output_file, merge_with=merge_with)
+    finally:
+        collector.cleanup()
+    if failed:
+        print('Error: The cracked hashes of hashlists %s could not be downloaded completely, they are harvested again next run.' % (
+            ', '.join(str(hashlistId) for hashlistId in failed)))
+    summary['failed'] = failed
+    # Only move the watermark of hashlists that were downloaded completely, the others are tried again next run.
+    for hashlistId in changed:
+        if hashlistId not in failed and harvested_counts.get(hashlistId, 0) >= cracked_counts[hashlistId]:
+            harvest_state.set_watermark(state, htserver, hashlistId, cracked_counts[hashlistId])
+    harvest_state.save_state(state_file, state)
+    return summary
+
+def collect_known_plaintext_passwords(htserver, accesskey, hashlistIds=None, workers=4, memory_budget_mb=512, temp_dir=None, collector=None, counts=None, failed=None):
+    # Stream the cracked hashes of the given hashlists (all known hashlists by default) concurrently into a
+    # wordlist.PlaintextCollector and return it. The caller is responsible for calling collector.cleanup().
+    # If a counts dict is given, it is filled with the number of cracked hashes received per hashlist ID.
+    # If a failed list is given, the IDs of the hashlists whose cracked hashes could not be downloaded completely are
+    # added to it. The plaintexts received from them before the error are still in the collector.
+    if hashlistIds is None:
+        hashlists = get_all_hashlists(htserver, accesskey)
+        if not hashlists:
+            return None
+        hashlistIds = [hashlist['hashlistId'] for hashlist in hashlists['hashlists']]
+    if collector is None:
+        collector = wordlist.PlaintextCollector(memory_budget_mb=memory_budget_mb, temp_dir=temp_dir)
+
+    def collect_hashlist(hashlistId):
+        # Hand the plaintexts to the collector in batches, so the collector lock is not taken for every single plaintext.
+        plains = []
+        received = 0
+        status = {}
+        for hash, plain, crackpos in iter_cracked_hashes(htserver, accesskey, hashlistId, status=status):
+            plains.append(plain)
+            received += 1
+            if len(plains) >= 10000:
+                collector.add_many(plains)
+                plains = []
+        collector.add_many(plains)
+        if counts is not None:
+            counts[hashlistId] = received
+        if failed is not None and not status['complete']:
+            failed.append(hashlistId)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for future in [executor.submit(collect_hashlist, hashlistId) for hashlistId in hashlistIds]:
+            future.result()
+    return collector
 
 def get_agent_settings(htserver, accesskey, agentId):
     # get
@@ -1174,6 +1763,20 @@ def set_agent_active(htserver, accesskey, agentId, state):
     }
     return submit_request(htserver, request_json_data)
 
+def set_agents_active(htserver, accesskey, agentIds, state, workers=None, stop_on_error=False):
+    # Set many agents active/inactive at once using submit_batch. Returns the per-agent results in the order of agentIds.
+    request_json_data_list = []
+    for agentId in agentIds:
+        request_json_data = {
+        "section": "agent",
+        "request": "setActive",
+        "active": state,
+        "agentId": agentId,
+        "accessKey": accesskey
+        }
+        request_json_data_list.append(request_json_data)
+    return submit_batch(htserver, request_json_data_list, workers=workers, stop_on_error=stop_on_error)
+
 def set_all_file_not_secret(htserver, accesskey):
     # setSecret
     # Set if an existing file is secret or not.
@@ -1191,6 +1794,7 @@ def set_all_file_not_secret(htserver, accesskey):
     # }
     # Get all file IDs.
     files = list_all_files(htserver, accesskey)
+    request_json_data_list = []
     for file in files['files']:
         request_json_data = {
         "section": "file",
@@ -1199,7 +1803,9 @@ def set_all_file_not_secret(htserver, accesskey):
         "isSecret": False,
         "accessKey": accesskey
         }
-        submit_request(htserver, request_json_data)
+        request_json_data_list.append(request_json_data)
+    # Send the setSecret requests over the batch worker pool.
+    return submit_batch(htserver, request_json_data_list)
 
 def set_preconfig_task_as_cpu_only(htserver, accesskey, pretaskId, state):
     # setPretaskCpuOnly
@@ -1255,6 +1861,25 @@ def set_task_as_cpu_only(htserver, accesskey, taskId, state):
     }
     return submit_request(htserver, request_json_data)
 
+def set_tasks_as_cpu_only(htserver, accesskey, taskIds, state, workers=None, stop_on_error=False):
+    # Set many tasks as CPU only (or not) at once using submit_batch. Returns the per-task results in the order of taskIds.
+    # Confirm state is a boolean value.
+    if state == 'true' or state is True:
+        state = True
+    else:
+        state = False
+    request_json_data_list = []
+    for taskId in taskIds:
+        request_json_data = {
+        "section": "task",
+        "request": "setTaskCpuOnly",
+        "taskId": taskId,
+        "isCpuOnly": state,
+        "accessKey": accesskey
+        }
+        request_json_data_list.append(request_json_data)
+    return submit_batch(htserver, request_json_data_list, workers=workers, stop_on_error=stop_on_error)
+
 def archive_supertask(htserver, accesskey, supertaskId):
     # archiveSupertask
     # Archive a supertask (including all subtasks).
@@ -1277,8 +1902,53 @@ def archive_supertask(htserver, accesskey, supertaskId):
     }
     return submit_request(htserver, request_json_data)
 
-def import_precracked_hashes(htserver, accesskey, hashlistId, filename):
-    import_precracked_hashes_process_file_in_memory(htserver, accesskey, hashlistId, filename, chunk_size_mb=10)
+def import_precracked_hashes(htserver, accesskey, hashlistId, filename, chunk_size_mb=10, max_in_flight=1, target_seconds=None,
+                             prefilter_left=False, resume=False, journal_file=None, dedupe=None, dedupe_false_positive_rate=0.001,
+                             dedupe_memory_cap_mb=1024, dedupe_by_hash=False, validate=False):
+    # With validate=True, lines whose hash does not match the format of the hashlist's hash type are dropped before upload.
+    # dedupe: None to upload every line, or 'exact', 'bloom' or 'auto' to drop duplicate lines before upload (see import_pipeline.make_dedupe_filter).
+    # With dedupe_by_hash only the first line of each hash is uploaded, instead of dropping only exact "hash:plain" duplicates.
+    validator = None
+    if validate:
+        hashlist = get_hashlist(htserver, accesskey, hashlistId)
+        if hashlist is None:
+            print('Could not get hashlist %s, importing without validation.' % hashlistId)
+        else:
+            validator = hash_validation.get_validator(hashlist['hashtypeId'], cracked=True)
+            if validator is None:
+                print('No known format for hash type %s, importing without validation.' % hashlist['hashtypeId'])
+    left_filter = None
+    if prefilter_left:
+        # Only upload the lines whose hash is still uncracked in the hashlist.
+        left_filter = get_left_hash_filter(htserver, accesskey, hashlistId)
+        if left_filter is None:
+            print('Could not get the left hashes of hashlist %s, importing without the pre-filter.' % hashlistId)
+        else:
+            print('Left hashes in hashlist %s: %s' % (hashlistId, len(left_filter)))
+    dedupe_filter = None
+    if dedupe:
+        separator_count = None
+        if dedupe_by_hash:
+            # The hash part of salted lists contains the separator as well, use the count the left list showed if there is one.
+            separator_count = left_filter.separator_counts[-1] if left_filter is not None and left_filter.separator_counts else 0
+        dedupe_filter = import_pipeline.make_dedupe_filter(filename, dedupe, false_positive_rate=dedupe_false_positive_rate,
+                                                           memory_cap_mb=dedupe_memory_cap_mb, separator_count=separator_count)
+        if dedupe_filter is None:
+            return None
+    # The validator and the left filter run first, so the dedupe filter only has to remember lines that would be uploaded.
+    line_filter = import_pipeline.FilterChain([validator, left_filter, dedupe_filter])
+    if not line_filter.filters:
+        line_filter = None
+    stats = import_precracked_hashes_process_file_in_memory(htserver, accesskey, hashlistId, filename, chunk_size_mb=chunk_size_mb,
+                                                            max_in_flight=max_in_flight, target_seconds=target_seconds,
+                                                            line_filter=line_filter, resume=resume, journal_file=journal_file)
+    if stats is not None and validator is not None:
+        stats['invalidLinesDropped'] = validator.invalid
+        print('Invalid lines dropped before upload: %s' % validator.invalid)
+    if stats is not None and dedupe_filter is not None:
+        stats['duplicateLines'] = dedupe_filter.duplicates
+        print('Duplicate lines dropped before upload: %s' % dedupe_filter.duplicates)
+    return stats
 
 def import_precracked_hashes_process_chunk(htserver, accesskey, hashlistId, lines):
     # importCracked
@@ -1311,41 +1981,188 @@ def import_precracked_hashes_process_chunk(htserver, accesskey, hashlistId, line
     """
     data_lines = ''.join(lines)
     data_lines = base64.b64encode(data_lines.encode()).decode()
+    return import_precracked_hashes_send_chunk(htserver, accesskey, hashlistId, data_lines)
+
+def import_precracked_hashes_send_chunk(htserver, accesskey, hashlistId, data):
+    """
+    Sends an already base64 encoded chunk of hash:plain lines to the server via the API.
+
+    Args:
+        data (str): Base64 encoded lines.
+    """
     request_json_data = {
     "section": "hashlist",
     "request": "importCracked",
     "hashlistId": hashlistId,
     "separator": ":",
-    "data": data_lines,
+    "data": data,
     "accessKey": accesskey
     }
     return submit_request(htserver, request_json_data)
 
-def import_precracked_hashes_process_file_in_memory(htserver, accesskey, hashlistId, file_path, chunk_size_mb):
+# Counters returned by importCracked that are summed up over all chunks of an import.
+import_stat_keys = ('linesProcessed', 'newCracked', 'alreadyCracked', 'invalidLines', 'notFound', 'tooLongPlains')
+
+def import_precracked_hashes_process_file_in_memory(htserver, accesskey, hashlistId, file_path, chunk_size_mb, max_in_flight=1, target_seconds=None,
+                                                    line_filter=None, resume=False, journal_file=None):
     """
-    Processes a large text file in memory, sending 100 MB chunks to an API
+    Processes a large text file in memory, sending chunks to the importCracked API
     without creating intermediate files.
 
+    Up to max_in_flight chunks are sent at the same time. While the server processes
+    them, the next chunks are read and base64 encoded.
+
+    If target_seconds is set, chunk_size_mb is only the starting size. The chunk size is
+    then grown or shrunk after every chunk so each request takes about target_seconds,
+    based on the returned processTime and linesProcessed (see import_pipeline.ChunkSizeController).
+
+    After every acknowledged chunk the file offset and the counters so far are written to a
+    checkpoint journal (file_path + '.hashlist_<id>.journal' by default). With resume=True an
+    interrupted import continues at the last committed offset instead of at byte 0.
+
     Args:
         file_path (str): Path to the large text file.
         chunk_size_mb (int): Size of each chunk in MB.
+        max_in_flight (int): Number of importCracked requests kept in flight at once.
+        target_seconds (int): Target time per importCracked request, or None for a fixed chunk size.
+        line_filter: Optional import_pipeline.LineFilter, e.g. import_pipeline.LeftHashFilter.
+            Lines it does not match are not uploaded.
+        resume (bool): Continue from the checkpoint journal if there is one.
+        journal_file (str): Path of the checkpoint journal.
+
+    Returns:
+        dict: The summed up importCracked counters, plus 'chunks', 'failedChunks' and 'filteredLines'.
     """
     print('Processing file: %s' % file_path)
-    chunk_size_bytes = chunk_size_mb * 1024 * 1024
-    current_chunk_size = 0
-    chunk_lines = []
-    new_cracked = 0
-    lines_processed = 0
-    already_cracked = 0
-    invalid_lines = 0
-    not_found = 0
-    too_long_plains = 0
+    chunk_size_bytes = int(chunk_size_mb * 1024 * 1024)
+    controller = None
+    if target_seconds:
+        controller = import_pipeline.ChunkSizeController(chunk_size_bytes, target_seconds=target_seconds)
+        chunk_size_bytes = controller.chunk_size
+    max_in_flight = max(1, int(max_in_flight))
+    # Make sure every chunk in flight gets its own keep-alive connection. Sessions other threads are using are not touched.
+    http_client.ensure_pool_size(max_in_flight)
+    stats = dict.fromkeys(import_stat_keys, 0)
+    stats['chunks'] = 0
+    stats['filteredLines'] = 0
     chunk_prcess_seconds_time = 60
+    failed = False
     # Get the size of the file in bytes
     file_size = os.path.getsize(file_path)
+
+    if journal_file is None:
+        journal_file = import_pipeline.default_journal_file(file_path, hashlistId)
+    journal = import_pipeline.ImportJournal(journal_file, file_path, hashlistId)
+    # Offset of the end of the last chunk the server acknowledged. Everything before it never has to be sent again.
+    committed_offset = 0
+    if resume:
+        checkpoint = journal.load(file_size)
+        if checkpoint:
+            committed_offset = checkpoint['offset']
+            stats.update(checkpoint['stats'])
+            print('Resuming at byte %s of %s (%s chunks already imported).' % (committed_offset, file_size, stats['chunks']))
+    stats['failedChunks'] = 0
+
     # Divide the file size by the chunk size to get the number of chunks
-    number_of_chunks = file_size / chunk_size_bytes
-    total_process_time = number_of_chunks * chunk_prcess_seconds_time
+    number_of_chunks = (file_size - committed_offset) / chunk_size_bytes
+    print_import_time_remaining(number_of_chunks * chunk_prcess_seconds_time / max_in_flight)
+    # Chunks that were sent but not answered yet, oldest first.
+    in_flight = deque()
+    # Bytes read from the file and bytes left after the line filter, used to size the raw chunks when lines are filtered.
+    raw_bytes_read = 0
+    filtered_bytes_kept = 0
+
+    def send_and_time_chunk(data):
+        # Runs on the worker pool. Returns the importCracked response and the seconds the client waited for it.
+        start_time = time.monotonic()
+        returned_data = import_precracked_hashes_send_chunk(htserver, accesskey, hashlistId, data)
+        return returned_data, time.monotonic() - start_time
+
+    def collect_oldest_chunk():
+        # Wait for the oldest chunk in flight and add its counters to the running totals.
+        # Chunks are collected oldest first, so the committed offset only ever covers chunks the server acknowledged.
+        nonlocal number_of_chunks, chunk_prcess_seconds_time, chunk_size_bytes, committed_offset, failed
+        future, chunk_bytes, chunk_filtered, end_offset = in_flight.popleft()
+        if future is None:
+            # Every line of this chunk was filtered, nothing was sent.
+            returned_data, elapsed = dict.fromkeys(import_stat_keys, 0), 0
+        else:
+            returned_data, elapsed = future.result()
+        # Example Return Data
+        # {'section': 'hashlist', 'request': 'importCracked', 'response': 'OK', 'linesProcessed': 234564, 'newCracked': 0, 'alreadyCracked': 1, 'invalidLines': 0, 'notFound': 234563, 'processTime': 60, 'tooLongPlains': 0}
+        if not returned_data:
+            stats['failedChunks'] += 1
+            failed = True
+            return False
+        if failed:
+            # An older chunk failed, so this one is sent again on resume. Do not count it or move the checkpoint past the failed chunk.
+            return False
+        # Take the data with numbers and ADD them to a new running value to keep track of the progress.
+        for key in import_stat_keys:
+            stats[key] += returned_data[key]
+        stats['filteredLines'] += chunk_filtered
+        committed_offset = end_offset
+        if future is not None:
+            stats['chunks'] += 1
+            chunk_prcess_seconds_time = returned_data['processTime']
+            if controller:
+                chunk_size_bytes = controller.update(chunk_bytes, returned_data['processTime'], returned_data['linesProcessed'], elapsed)
+        journal.commit(committed_offset, file_size, stats)
+        # Work out the chunks remaining from the bytes not imported yet, the chunk size may have changed.
+        number_of_chunks = max(0, file_size - committed_offset) / chunk_size_bytes
+        print_import_progress(stats, number_of_chunks, chunk_prcess_seconds_time, max_in_flight)
+        return True
+
+    def send_chunk(data, chunk_filtered, end_offset):
+        # Encode the chunk first, while the chunks already in flight are processed by the server, then wait for a free
+        # slot and hand it to the worker pool. Returns False if a chunk failed and no more chunks should be sent.
+        encoded = base64.b64encode(data).decode('ascii') if len(data) else None
+        while len(in_flight) >= max_in_flight:
+            if not collect_oldest_chunk():
+                return False
+        if encoded is None:
+            in_flight.append((None, 0, chunk_filtered, end_offset))
+        else:
+            in_flight.append((executor.submit(send_and_time_chunk, encoded), len(data), chunk_filtered, end_offset))
+        return True
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        # The file is memory-mapped and cut into chunks on line boundaries. Without a line filter every chunk is base64
+        # encoded straight from a memoryview slice of the map, without creating any per-line Python objects.
+        with import_pipeline.FileChunker(file_path, start_offset=committed_offset) as chunker:
+            while True:
+                raw_chunk_size = chunk_size_bytes
+                if line_filter and filtered_bytes_kept:
+                    # Read enough raw bytes that the filtered chunk is about chunk_size_bytes, but never more than
+                    # max_raw_chunk_bytes. The filters copy the chunk out of the map block by block, not as a whole.
+                    raw_chunk_size = int(chunk_size_bytes * min(100, raw_bytes_read / filtered_bytes_kept))
+                    raw_chunk_size = max(chunk_size_bytes, min(raw_chunk_size, import_pipeline.max_raw_chunk_bytes))
+                chunk = chunker.next_chunk(raw_chunk_size)
+                if chunk is None:
+                    break
+                with chunk as data:
+                    chunk_filtered = 0
+                    raw_bytes_read += len(data)
+                    if line_filter:
+                        data, chunk_filtered = line_filter.filter_chunk(data)
+                        filtered_bytes_kept += len(data)
+                    # Process the current chunk
+                    if not send_chunk(data, chunk_filtered, chunker.offset):
+                        break
+        # Wait for the chunks still in flight.
+        while in_flight:
+            collect_oldest_chunk()
+    print()
+    if not failed:
+        journal.commit(file_size, file_size, stats, complete=True)
+    if stats['filteredLines']:
+        print('Lines filtered before upload: %s' % stats['filteredLines'])
+    if failed:
+        print('Import stopped after a failed chunk. %s chunks were imported, run again with resume to continue at byte %s.' % (
+            stats['chunks'], committed_offset))
+    return stats
+
+def print_import_time_remaining(total_process_time):
     if total_process_time > 60 and total_process_time < 3600:
         total_process_time = total_process_time / 60
         print('Total Process Time: %d minutes' % total_process_time)
@@ -1353,47 +2170,19 @@ def import_precracked_hashes_process_file_in_memory(htserver, accesskey, hashlis
         total_process_time = total_process_time / 3600
         print('Total Process Time: %d hours' % total_process_time)
 
-    with open(file_path, 'r', encoding='utf-8') as file:
-        for line in file:
-            line_size = len(line.encode('utf-8'))
-            if current_chunk_size + line_size > chunk_size_bytes and chunk_lines:
-                # Process the current chunk
-                returned_data = import_precracked_hashes_process_chunk(htserver, accesskey, hashlistId, chunk_lines)
-                # Example Return Data
-                # {'section': 'hashlist', 'request': 'importCracked', 'response': 'OK', 'linesProcessed': 234564, 'newCracked': 0, 'alreadyCracked': 1, 'invalidLines': 0, 'notFound': 234563, 'processTime': 60, 'tooLongPlains': 0}
-                # Take the data with numbers and ADD them to a new running value to keep track of the progress.
-                new_cracked += returned_data['newCracked']
-                lines_processed += returned_data['linesProcessed']
-                already_cracked += returned_data['alreadyCracked']
-                invalid_lines += returned_data['invalidLines']
-                not_found += returned_data['notFound']
-                too_long_plains += returned_data['tooLongPlains']
-                chunk_prcess_seconds_time = returned_data['processTime']
-                total_process_time = number_of_chunks * chunk_prcess_seconds_time
-                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                if total_process_time > 60 and total_process_time < 3600:
-                    # Convert seconds to minutes and round to 2 decimal places.
-                    total_process_time = total_process_time / 60
-                    # round total_process_time to 2 decimal places.
-                    total_process_time = round(total_process_time, 2)
-                    print('%s ::: ChunksRemaining: %s - TimeRemaining: %s minutes - ProcessTime: %d - NewCracks: %s - AlreadyCracked: %s - LinesProcessed: %s - InvalidLines: %s - NotFound: %s - TooLongPlains: %s' % (timestamp, round(number_of_chunks), total_process_time, chunk_prcess_seconds_time, new_cracked, already_cracked, lines_processed, invalid_lines, not_found, too_long_plains), flush=True,end="\r")
-                if total_process_time > 3600:
-                    total_process_time = total_process_time / 3600
-                    total_process_time = round(total_process_time, 2)
-                    print('%s ::: ChunksRemaining: %s - TimeRemaining: %s hours - ProcessTime: %d - NewCracks: %s - AlreadyCracked: %s - LinesProcessed: %s - InvalidLines: %s - NotFound: %s - TooLongPlains: %s' % (timestamp, round(number_of_chunks), total_process_time, chunk_prcess_seconds_time, new_cracked, already_cracked, lines_processed, invalid_lines, not_found, too_long_plains), flush=True,end="\r")
-                # Minus 1 from number_of_chunks to keep track of the progress.
-                number_of_chunks -= 1
-                # Reset for the next chunk
-                current_chunk_size = 0
-                chunk_lines = []
-
-            # Add the line to the current chunk
-            chunk_lines.append(line)
-            current_chunk_size += line_size
-
-        # Process any remaining lines in the final chunk
-        if chunk_lines:
-            import_precracked_hashes_process_chunk(htserver, accesskey, hashlistId, chunk_lines)
+def print_import_progress(stats, number_of_chunks, chunk_prcess_seconds_time, max_in_flight=1):
+    total_process_time = number_of_chunks * chunk_prcess_seconds_time / max_in_flight
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if total_process_time > 3600:
+        time_remaining = '%s hours' % round(total_process_time / 3600, 2)
+    elif total_process_time > 60:
+        # Convert seconds to minutes and round to 2 decimal places.
+        time_remaining = '%s minutes' % round(total_process_time / 60, 2)
+    else:
+        time_remaining = '%s seconds' % round(total_process_time)
+    print('%s ::: ChunksRemaining: %s - TimeRemaining: %s - ProcessTime: %d - NewCracks: %s - AlreadyCracked: %s - LinesProcessed: %s - InvalidLines: %s - NotFound: %s - TooLongPlains: %s' % (
+        timestamp, round(number_of_chunks), time_remaining, chunk_prcess_seconds_time, stats['newCracked'], stats['alreadyCracked'],
+        stats['linesProcessed'], stats['invalidLines'], stats['notFound'], stats['tooLongPlains']), flush=True, end="\r")
 
 def import_preconfigured_task(htserver, accesskey, cracker_version, hashlistId, file_path):
     # Open a text file containing preconfigured tasks in json format. Take the vaules and create the tasks using the create_task function.
@@ -1546,6 +2335,19 @@ def delete_task(htserver, accesskey, taskId):
     }
     return submit_request(htserver, request_json_data)
 
+def delete_tasks(htserver, accesskey, taskIds, workers=None, stop_on_error=False):
+    # Delete many tasks at once using submit_batch. Returns the per-task results in the order of taskIds.
+    request_json_data_list = []
+    for taskId in taskIds:
+        request_json_data = {
+        "section": "task",
+        "request": "deleteTask",
+        "taskId": taskId,
+        "accessKey": accesskey
+        }
+        request_json_data_list.append(request_json_data)
+    return submit_batch(htserver, request_json_data_list, workers=workers, stop_on_error=stop_on_error)
+
 def delete_supertask(htserver, accesskey, supertaskId):
     # deleteSupertask
     # Delete a running supertask. This includes all contained subtasks.
@@ -1679,6 +2481,19 @@ def archive_task(htserver, accesskey, taskId):
     }
     return submit_request(htserver, request_json_data)
 
+def archive_tasks(htserver, accesskey, taskIds, workers=None, stop_on_error=False):
+    # Archive many tasks at once using submit_batch. Returns the per-task results in the order of taskIds.
+    request_json_data_list = []
+    for taskId in taskIds:
+        request_json_data = {
+        "section": "task",
+        "request": "archiveTask",
+        "taskId": taskId,
+        "accessKey": accesskey
+        }
+        request_json_data_list.append(request_json_data)
+    return submit_batch(htserver, request_json_data_list, workers=workers, stop_on_error=stop_on_error)
+
 def upload_file(htserver, accesskey, filename, filedata):
     # addFile
     # There are multiple ways to add a file, either from an URL, from the import directory or inline. The filename is only relevant if
@@ -0,0 +1,190 @@
+#!/bin/env python3
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import inc.hashtopolis as hashtopolis
+import inc.http_client as http_client
+
+# asyncio counterparts of the inc/hashtopolis.py functions.
+# Each request is still sent by hashtopolis.submit_request() over the pooled keep-alive session from inc/http_client.py,
+# but it runs on a worker thread so one event loop can keep many requests in flight against /api/user.php at once.
+# A semaphore per event loop caps the number of requests in flight.
+# Example:
+#     hashlists = hashtopolis_async.run(hashtopolis_async.get_all_hashlists(htserver, accesskey))
+
+# "concurrency": Maximum number of requests in flight at the same time.
+settings = {
+    "concurrency": 32
+}
+
+_executor = None
+_semaphores = weakref.WeakKeyDictionary()
+
+def configure(concurrency=None):
+    # Change the maximum number of requests in flight. The HTTP connection pool is grown to match, otherwise the
+    # worker threads would just wait on each other for a free connection.
+    global _executor
+    if concurrency is not None:
+        settings['concurrency'] = int(concurrency)
+    if _executor:
+        _executor.shutdown(wait=False)
+        _executor = None
+    _semaphores.clear()
+    http_client.ensure_pool_size(settings['concurrency'])
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        http_client.ensure_pool_size(settings['concurrency'])
+        _executor = ThreadPoolExecutor(max_workers=settings['concurrency'], thread_name_prefix='hashtopolis_async')
+    return _executor
+
+def _get_semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings['concurrency'])
+        _semaphores[loop] = semaphore
+    return semaphore
+
+async def _run(function, *args):
+    # Run a blocking hashtopolis function on the worker pool, limited by the concurrency semaphore.
+    async with _get_semaphore():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), function, *args)
+
+def run(coroutine):
+    # Run a coroutine from synchronous code and return its result.
+    return asyncio.run(coroutine)
+
+async def submit_request(htserver, request_json_data):
+    # Async version of hashtopolis.submit_request(). Returns the decoded JSON response, or None on error.
+    return await _run(hashtopolis.submit_request, htserver, request_json_data)
+
+async def submit_requests(htserver, request_json_data_list):
+    # Send a list of requests concurrently and return the responses in the same order as the requests.
+    return await asyncio.gather(*[submit_request(htserver, request_json_data) for request_json_data in request_json_data_list])
+
+# Read / list functions
+
+async def get_server_config(htserver, accessKey, configItem):
+    return await _run(hashtopolis.get_server_config, htserver, accessKey, configItem)
+
+async def get_cracker_version(htserver, accessKey):
+    return await _run(hashtopolis.get_cracker_version, htserver, accessKey)
+
+async def get_active_hashlists(htserver, accessKey):
+    return await _run(hashtopolis.get_active_hashlists, htserver, accessKey)
+
+async def get_archived_hashlists(htserver, accessKey):
+    return await _run(hashtopolis.get_archived_hashlists, htserver, accessKey)
+
+async def get_all_hashlists(htserver, accessKey):
+    # Fetch the active and archived hashlists at the same time and combine them.
+    hashlists, archived_hashlists = await asyncio.gather(
+        get_active_hashlists(htserver, accessKey),
+        get_archived_hashlists(htserver, accessKey)
+    )
+    if hashlists and archived_hashlists:
+        hashlists = dict(hashlists, hashlists=hashlists['hashlists'] + archived_hashlists['hashlists'])
+    return hashlists
+
+async def get_a_file(htserver, accessKey, fileId):
+    return await _run(hashtopolis.get_a_file, htserver, accessKey, fileId)
+
+async def get_cracked_hashes(htserver, accesskey, hashlistId):
+    return await _run(hashtopolis.get_cracked_hashes, htserver, accesskey, hashlistId)
+
+async def get_task(htserver, accesskey, taskId):
+    return await _run(hashtopolis.get_task, htserver, accesskey, taskId)
+
+async def get_task_details(htserver, accesskey, taskid):
+    return await _run(hashtopolis.get_task_details, htserver, accesskey, taskid)
+
+async def get_all_task_details(htserver, accesskey, taskIds=None):
+    # Get the details of many tasks at once. If no task IDs are given, all normal tasks (type 0) on the server are used.
+    # Returns a list of task details in the same order as the task IDs.
+    if taskIds is None:
+        tasks = await get_all_tasks(htserver, accesskey)
+        if not tasks:
+            return None
+        taskIds = [task['taskId'] for task in tasks['tasks'] if task['type'] == 0]
+    return await asyncio.gather(*[get_task_details(htserver, accesskey, taskId) for taskId in taskIds])
+
+async def get_all_tasks(htserver, accesskey):
+    return await _run(hashtopolis.get_all_tasks, htserver, accesskey)
+
+async def get_all_superhashlists(htserver, accesskey):
+    return await _run(hashtopolis.get_all_superhashlists, htserver, accesskey)
+
+async def get_agent_settings(htserver, accesskey, agentId):
+    return await _run(hashtopolis.get_agent_settings, htserver, accesskey, agentId)
+
+async def list_all_files(htserver, accesskey):
+    return await _run(hashtopolis.list_all_files, htserver, accesskey)
+
+async def list_all_preconfigured_supertasks(htserver, accesskey):
+    return await _run(hashtopolis.list_all_preconfigured_supertasks, htserver, accesskey)
+
+async def list_supertask_subtasks(htserver, accesskey, supertaskId):
+    return await _run(hashtopolis.list_supertask_subtasks, htserver, accesskey, supertaskId)
+
+async def list_server_config(htserver, accessKey):
+    return await _run(hashtopolis.list_server_config, htserver, accessKey)
+
+async def list_all_agents(htserver, accesskey):
+    return await _run(hashtopolis.list_all_agents, htserver, accesskey)
+
+async def get_all_known_plaintext_passwords(htserver, accesskey):
+    # Async version of hashtopolis.get_all_known_plaintext_passwords(). The cracked hashes of all hashlists are fetched concurrently.
+    # Returns None if the hashlists could not be listed or the cracked hashes of a hashlist could not be downloaded.
+    hashlists = await get_all_hashlists(htserver, accesskey)
+    if not hashlists:
+        return None
+    hashlistIds = [hashlist['hashlistId'] for hashlist in hashlists['hashlists']]
+    all_cracked_hashes = await asyncio.gather(
+        *[get_cracked_hashes(htserver, accesskey, hashlistId) for hashlistId in hashlistIds]
+    )
+    failed = [hashlistId for hashlistId, cracked_hashes in zip(hashlistIds, all_cracked_hashes) if not cracked_hashes]
+    if failed:
+        print('Error: The cracked hashes of hashlists %s could not be downloaded.' % ', '.join(str(hashlistId) for hashlistId in failed))
+        return None
+    plaintext_passwords = set()
+    for cracked_hashes in all_cracked_hashes:
+        for hash in cracked_hashes['cracked']:
+            plaintext_passwords.add(hash['plain'])
+    # Remove any empty strings and sort the plaintext passwords.
+    plaintext_passwords.discard('')
+    return sorted(plaintext_passwords)
+
+# Set functions
+
+async def set_agent_extra_param(htserver, accesskey, agentId, value):
+    return await _run(hashtopolis.set_agent_extra_param, htserver, accesskey, agentId, value)
+
+async def set_agent_active(htserver, accesskey, agentId, state):
+    return await _run(hashtopolis.set_agent_active, htserver, accesskey, agentId, state)
+
+async def set_file_secret(htserver, accesskey, fileId, state):
+    request_json_data = {
+    "section": "file",
+    "request": "setSecret",
+    "fileId": fileId,
+    "isSecret": state,
+    "accessKey": accesskey
+    }
+    return await submit_request(htserver, request_json_data)
+
+async def set_all_file_not_secret(htserver, accesskey):
+    # Async version of hashtopolis.set_all_file_not_secret(). All setSecret requests are sent concurrently.
+    # Returns the list of responses in the same order as the files.
+    files = await list_all_files(htserver, accesskey)
+    if not files:
+        return None
+    return await asyncio.gather(*[set_file_secret(htserver, accesskey, file['fileId'], False) for file in files['files']])
+
+async def set_preconfig_task_as_cpu_only(htserver, accesskey, pretaskId, state):
+    return await _run(hashtopolis.set_preconfig_task_as_cpu_only, htserver, accesskey, pretaskId, state)
+
+async def set_task_as_cpu_only(htserver, accesskey, taskId, state):
+    return await _run(hashtopolis.set_task_as_cpu_only, htserver, accesskey, taskId, state)
@@ -0,0 +1,164 @@
+#!/bin/env python3
+import hashlib
+import json
+import os
+import time
+import requests
+import inc.common as common
+import inc.http_client as http_client
+
+# On-disk cache for JSON GET requests that are polled often, such as the HashMob catalogs and the Hashes.com job list.
+# The response body is stored together with its ETag and Last-Modified headers. Within "ttl" seconds the cached
+# response is returned without a request. After that the request is sent with If-None-Match / If-Modified-Since, and a
+# "304 Not Modified" answer returns the cached response without downloading it again.
+# Cache files are named after a SHA-256 of the URL, so API keys in the URL are never written to disk.
+# Each cache file is plain text: one JSON line with the headers, then the response body as it was received. A cache
+# file is only ever parsed as JSON, never executed. Revalidation only reads the header line, not the body.
+
+# Default settings. These can be changed with the configure() function, e.g. from the "http_cache" section of config.json.
+# "enabled": Set to False to always send a plain GET request.
+# "cache_dir": Directory of the cache files.
+# "ttl": Seconds a cached response is used without asking the server again.
+settings = {
+    "enabled": True,
+    "cache_dir": os.path.join(os.path.expanduser('~'), '.cache', 'hashmaster', 'http'),
+    "ttl": 60
+}
+
+# A header line longer than this was not written by this module.
+_max_header_bytes = 64 * 1024
+
+def configure(enabled=None, cache_dir=None, ttl=None):
+    if enabled is not None:
+        settings['enabled'] = bool(enabled)
+    if cache_dir is not None:
+        settings['cache_dir'] = os.path.expanduser(cache_dir)
+    if ttl is not None:
+        settings['ttl'] = float(ttl)
+
+def configure_from_config(config):
+    # Load the optional "http_cache" section from the config.json settings.
+    # Example:
+    # "http_cache": {
+    #     "enabled": true,
+    #     "cache_dir": "~/.cache/hashmaster/http",
+    #     "ttl": 60
+    # }
+    configure(**common.config_section(config, 'http_cache'))
+
+def _cache_file(url):
+    return os.path.join(settings['cache_dir'], hashlib.sha256(url.encode()).hexdigest() + '.cache')
+
+def _load(cache_file, with_body=False):
+    # Return the (header, body) of a cache file, the body is only read with_body.
+    # A missing or damaged cache file returns (None, None). It is treated as a cache miss and overwritten by the next response.
+    try:
+        with open(cache_file, 'r', encoding='utf-8', newline='') as f:
+            header = json.loads(f.readline(_max_header_bytes))
+            body = f.read() if with_body else None
+    except (OSError, ValueError):
+        return None, None
+    if not isinstance(header, dict):
+        return None, None
+    return header, body
+
+def _store(cache_file, response):
+    header = {
+        "etag": response.headers.get('ETag'),
+        "last_modified": response.headers.get('Last-Modified')
+    }
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    with common.atomic_write(cache_file, 'w', encoding='utf-8', newline='') as f:
+        f.write(json.dumps(header) + '\n')
+        f.write(response.text)
+
+def _decode(body):
+    # Parse a cached body, None if it is not valid JSON.
+    try:
+        return json.loads(body)
+    except (TypeError, ValueError):
+        return None
+
+def invalidate(url=None):
+    # Remove the cached response of one URL, or of all URLs.
+    if url is not None:
+        cache_files = [_cache_file(url)]
+    elif os.path.isdir(settings['cache_dir']):
+        cache_files = [os.path.join(settings['cache_dir'], name) for name in os.listdir(settings['cache_dir']) if name.endswith('.cache')]
+    else:
+        cache_files = []
+    for cache_file in cache_files:
+        try:
+            os.remove(cache_file)
+        except FileNotFoundError:
+            pass
+
+def _get(url, **kwargs):
+    # GET the URL through the pooled client. Prints the error and returns None if the request fails.
+    try:
+        return http_client.get(url, **kwargs)
+    except requests.exceptions.RequestException as error_code:
+        print('Error: %s' % error_code)
+        return None
+
+def get_json(url, ttl=None, **kwargs):
+    # GET a JSON URL through the cache and return the parsed object.
+    # Returns None and prints the error if the request fails or the response is not a 200 or 304.
+    # The cached body is parsed again on every call, so each caller gets its own copy and can change it.
+    if not settings['enabled']:
+        response = _get(url, **kwargs)
+        if response is None:
+            return None
+        if response.status_code != 200:
+            print("Error: %s" % (response.text))
+            return None
+        try:
+            return response.json()
+        except ValueError as error_code:
+            print('Error: %s' % error_code)
+            return None
+    if ttl is None:
+        ttl = settings['ttl']
+    cache_file = _cache_file(url)
+    # The modification time of the cache file is the time the response was last confirmed by the server.
+    try:
+        fresh = time.time() - os.path.getmtime(cache_file) < ttl
+    except OSError:
+        fresh = False
+    header, body = _load(cache_file, with_body=fresh)
+    if fresh and header is not None:
+        data = _decode(body)
+        if data is not None:
+            return data
+    headers = dict(kwargs.pop('headers', None) or {})
+    validators = {}
+    if header is not None:
+        if header.get('etag'):
+            validators['If-None-Match'] = header['etag']
+        if header.get('last_modified'):
+            validators['If-Modified-Since'] = header['last_modified']
+    response = _get(url, headers=dict(headers, **validators), **kwargs)
+    if response is None:
+        return None
+    if response.status_code == 304 and validators:
+        cached_header, body = _load(cache_file, with_body=True)
+        data = _decode(body)
+        # Only use the body if the file still holds the response the validators were sent for.
+        if cached_header == header and data is not None:
+            # Not modified, only restart the TTL instead of writing the cached response again.
+            os.utime(cache_file, None)
+            return data
+        # The cache file was replaced or is damaged, ask again without validators.
+        response = _get(url, headers=headers, **kwargs)
+        if response is None:
+            return None
+    if response.status_code != 200:
+        print("Error: %s" % (response.text))
+        return None
+    try:
+        data = response.json()
+    except ValueError as error_code:
+        print('Error: %s' % error_code)
+        return None
+    _store(cache_file, response)
+    return data
@@ -0,0 +1,110 @@
+#!/bin/env python3
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+import inc.common as common
+
+# Shared HTTP client layer used by the Hashtopolis, Hashes.com and HashMob.net modules.
+# Every host gets its own requests.Session with a pooled, keep-alive HTTPAdapter, so repeated calls against the same
+# server reuse the already open TCP/TLS connections instead of doing a new handshake for every request.
+
+# Default settings. These can be changed with the configure() function, e.g. from the "http" section of config.json.
+# "pool_size": Number of keep-alive connections kept open per host.
+# "connect_timeout": Seconds to wait for a TCP connection to be established.
+# "read_timeout": Seconds to wait for the server to send data. Hashtopolis importCracked calls can take a few minutes.
+#                 A request that runs into a timeout raises a requests.exceptions.RequestException, like a connection error.
+# "max_retries": Number of times a failed connection attempt is retried (only connection errors, never a sent request).
+settings = {
+    "pool_size": 10,
+    "connect_timeout": 10,
+    "read_timeout": 300,
+    "max_retries": 2
+}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def configure(pool_size=None, connect_timeout=None, read_timeout=None, max_retries=None):
+    # Change the pool size, timeouts or retries. The settings are used for all following requests (see _reset_sessions()).
+    if pool_size is not None:
+        settings['pool_size'] = int(pool_size)
+    if connect_timeout is not None:
+        settings['connect_timeout'] = float(connect_timeout)
+    if read_timeout is not None:
+        settings['read_timeout'] = float(read_timeout)
+    if max_retries is not None:
+        settings['max_retries'] = int(max_retries)
+    _reset_sessions()
+
+def ensure_pool_size(pool_size):
+    # Grow the pool size to at least pool_size, e.g. for a pool of that many worker threads. Never shrinks it.
+    if settings['pool_size'] < pool_size:
+        configure(pool_size=pool_size)
+
+def configure_from_config(config):
+    # Load the optional "http" section from the config.json settings.
+    # Example:
+    # "http": {
+    #     "pool_size": 10,
+    #     "connect_timeout": 10,
+    #     "read_timeout": 300,
+    #     "max_retries": 2
+    # }
+    configure(**common.config_section(config, 'http'))
+
+def timeout():
+    # Return the (connect, read) timeout tuple to pass to every request.
+    return (settings['connect_timeout'], settings['read_timeout'])
+
+def _host_key(url):
+    # Sessions are keyed by scheme and host:port, e.g. "https://hashmob.net".
+    parts = urlsplit(url)
+    return "%s://%s" % (parts.scheme, parts.netloc)
+
+def get_session(url):
+    # Return the pooled session for the host of the given URL, creating it on first use.
+    # requests.Session is safe to share between threads for plain GET/POST calls, so the worker pools in the
+    # other modules can all use the same session for a host.
+    key = _host_key(url)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings['pool_size'],
+                    max_retries=settings['max_retries'],
+                    pool_block=True
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _sessions[key] = session
+    return session
+
+def get(url, **kwargs):
+    # GET request through the pooled session of the host.
+    kwargs.setdefault('timeout', timeout())
+    return get_session(url).get(url, **kwargs)
+
+def post(url, **kwargs):
+    # POST request through the pooled session of the host.
+    kwargs.setdefault('timeout', timeout())
+    return get_session(url).post(url, **kwargs)
+
+def _reset_sessions():
+    # Forget the current sessions, so the next request to each host creates a new session with the current settings.
+    # The old sessions are not closed: requests that other threads are running on them finish normally, and their
+    # connections are closed once nothing uses them anymore.
+    global _sessions
+    with _sessions_lock:
+        _sessions = {}
+
+def close_all():
+    # Close all pooled sessions and their open connections.
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,414 @@
+#!/bin/env python3
+import hashlib
+import json
+import math
+import mmap
+import os
+from datetime import datetime
+import inc.common as common
+
+# Helpers for the Hashtopolis importCracked pipeline in inc/hashtopolis.py.
+
+def line_hash_key(line, separator_count=0, separator=b':'):
+    # Return the hash part of a "hash:plain" line as lower case bytes. For salted hashes ("hash:salt:plain")
+    # separator_count is the number of separators inside the hash part, 1 in this example.
+    position = -1
+    for _ in range(separator_count + 1):
+        position = line.find(separator, position + 1)
+        if position == -1:
+            return None
+    return line[:position].lower()
+
+# Size of the blocks a chunk is filtered in, so a large memory-mapped chunk is never copied as a whole.
+filter_block_size = 8 * 1024 * 1024
+# Upper limit of the raw bytes read for one chunk when a filter drops most lines and the raw chunk is grown to make up for it.
+max_raw_chunk_bytes = 256 * 1024 * 1024
+
+def split_lines(data):
+    # Split bytes into lines, keeping the line breaks. Only \n ends a line, like in FileChunker. bytes.splitlines()
+    # would also split on a lone \r, \x0b, \x0c or \x1c-\x1e, which can all be part of a plain.
+    lines = data.split(b'\n')
+    last = lines.pop()
+    lines = [line + b'\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+def iter_line_blocks(data, block_size=None):
+    # Yield a chunk (bytes or a memoryview of a memory map) as bytes blocks of about block_size that end on a line break.
+    # Only one block is copied out of the chunk at a time.
+    if block_size is None:
+        block_size = filter_block_size
+    if isinstance(data, bytes) and len(data) <= block_size:
+        if data:
+            yield data
+        return
+    start = 0
+    length = len(data)
+    while start < length:
+        end = min(start + block_size, length)
+        block = bytes(data[start:end])
+        if end < length:
+            cut = block.rfind(b'\n')
+            # A line longer than the block, read on until its line break.
+            while cut == -1 and end < length:
+                more = bytes(data[end:min(end + block_size, length)])
+                cut = more.find(b'\n')
+                if cut != -1:
+                    cut += len(block)
+                block += more
+                end += len(more)
+            if cut != -1:
+                block = block[:cut + 1]
+        start += len(block)
+        yield block
+
+class LineFilter:
+    # Base class of the line filters used by the import pipeline. Subclasses implement matches(line) for one line
+    # (bytes, including the line break) and may override filter_chunk with something faster.
+    def matches(self, line):
+        return True
+
+    def filter_chunk(self, data):
+        # Filter a chunk of lines. Returns the kept lines as bytes and the number of lines that were dropped.
+        kept = []
+        dropped = 0
+        for block in iter_line_blocks(data):
+            for line in split_lines(block):
+                if self.matches(line):
+                    kept.append(line)
+                else:
+                    dropped += 1
+        return b''.join(kept), dropped
+
+class LeftHashFilter(LineFilter):
+    # Set of the hashes of a hashlist that are not cracked yet, used to drop "hash:plain" lines before they are uploaded
+    # with importCracked. Lines for hashes that are already cracked or not in the hashlist at all would only come back
+    # as alreadyCracked or notFound.
+    # Hashes are compared in lower case. For case sensitive hash formats that can only let a few extra lines through,
+    # it never drops a line the server would have accepted.
+    # Example:
+    #     left_filter = LeftHashFilter([b'098f6bcd4621d373cade4e832627b4f6'])
+    #     left_filter.matches(b'098f6bcd4621d373cade4e832627b4f6:test\n')   # True
+    def __init__(self, left_lines, separator=b':'):
+        self.separator = separator
+        self.hashes = set()
+        # Number of separators inside the left list entries, e.g. {0} for unsalted and {1} for "hash:salt" lists.
+        self.separator_counts = set()
+        for line in left_lines:
+            line = line.strip()
+            if line:
+                self.hashes.add(line.lower())
+                self.separator_counts.add(line.count(separator))
+        self.separator_counts = sorted(self.separator_counts)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def matches(self, line):
+        # True if the hash part of the line is one of the left hashes.
+        for separator_count in self.separator_counts:
+            if line_hash_key(line, separator_count, self.separator) in self.hashes:
+                return True
+        return False
+
+class FilterChain(LineFilter):
+    # Keeps the lines that all filters keep. The filters are asked in order, so put the cheapest or most selective first.
+    def __init__(self, filters):
+        self.filters = [line_filter for line_filter in filters if line_filter is not None]
+
+    def matches(self, line):
+        for line_filter in self.filters:
+            if not line_filter.matches(line):
+                return False
+        return True
+
+    def filter_chunk(self, data):
+        # Run the chunk through each filter's own filter_chunk, so filters with a batch implementation keep their speed.
+        dropped = 0
+        for line_filter in self.filters:
+            data, filter_dropped = line_filter.filter_chunk(data)
+            dropped += filter_dropped
+        return bytes(data), dropped
+
+class DedupeFilter(LineFilter):
+    # Drops lines that were already seen earlier in the import. By default the whole line is the key, so only exact
+    # "hash:plain" duplicates are dropped. With separator_count set only the hash part is used as key (see line_hash_key()),
+    # so a hash is uploaded once no matter how many plains the file has for it.
+    # Lines before a resume offset are not seen again, so duplicates across a resume are still uploaded once more.
+    def __init__(self, separator_count=None, separator=b':'):
+        self.separator_count = separator_count
+        self.separator = separator
+        self.duplicates = 0
+
+    def key(self, line):
+        line = line.rstrip(b'\r\n')
+        if self.separator_count is None:
+            return line
+        return line_hash_key(line, self.separator_count, self.separator) or line
+
+    def matches(self, line):
+        if self.seen(self.key(line)):
+            self.duplicates += 1
+            return False
+        return True
+
+class ExactDedupeFilter(DedupeFilter):
+    # Dedupe with a set of all keys. Exact, but needs memory for every unique line, use it for small inputs.
+    def __init__(self, separator_count=None, separator=b':'):
+        super().__init__(separator_count, separator)
+        self.keys = set()
+
+    def seen(self, key):
+        # Return True if the key was seen before, and remember it.
+        if key in self.keys:
+            return True
+        self.keys.add(key)
+        return False
+
+class BloomDedupeFilter(DedupeFilter):
+    # Dedupe with a Bloom filter of a fixed size. It never lets a duplicate through, but with false_positive_rate it drops a
+    # unique line as a duplicate, which loses that crack for this import. The bit array is sized for expected_lines at
+    # false_positive_rate and capped at memory_cap_mb, a capped filter has a higher false positive rate.
+    # Example: 1 billion lines at 0.001 take about 1.7 GiB, 100 million lines about 172 MiB.
+    def __init__(self, expected_lines, false_positive_rate=0.001, memory_cap_mb=1024, separator_count=None, separator=b':'):
+        super().__init__(separator_count, separator)
+        expected_lines = max(1, int(expected_lines))
+        bits = -expected_lines * math.log(false_positive_rate) / (math.log(2) ** 2)
+        self.size_bits = max(8, min(int(bits), int(memory_cap_mb * 1024 * 1024 * 8)))
+        self.hash_count = max(1, round(self.size_bits / expected_lines * math.log(2)))
+        self.bits = bytearray((self.size_bits + 7) // 8)
+
+    def seen(self, key):
+        # Double hashing: the k bit positions are h1 + i * h2 of one 128 bit blake2b digest.
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        bits = self.bits
+        found = True
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % self.size_bits
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                found = False
+                bits[byte] |= mask
+        return found
+
+def estimate_line_count(file_path, sample_bytes=1024 * 1024):
+    # Estimate the number of lines in a file from the average line length of its first sample_bytes.
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_bytes)
+    lines = sample.count(b'\n')
+    if not lines:
+        return 1
+    return max(1, int(file_size / (len(sample) / lines)))
+
+# Rough number of bytes a bytes key in a set costs on top of its characters (object header plus set slot).
+_set_entry_overhead = 80
+
+def estimate_exact_dedupe_bytes(file_path):
+    # Estimate the memory an ExactDedupeFilter needs for a file: the characters of every line plus the per-key overhead.
+    return os.path.getsize(file_path) + estimate_line_count(file_path) * _set_entry_overhead
+
+def make_dedupe_filter(file_path, mode='auto', false_positive_rate=0.001, memory_cap_mb=1024, separator_count=None):
+    # Return the dedupe filter for an import file.
+    # mode: 'exact' for an ExactDedupeFilter, 'bloom' for a BloomDedupeFilter, 'auto' for exact if the estimated memory
+    # of the exact set fits in memory_cap_mb and bloom otherwise.
+    if mode == 'auto':
+        mode = 'exact' if estimate_exact_dedupe_bytes(file_path) <= memory_cap_mb * 1024 * 1024 else 'bloom'
+    if mode == 'exact':
+        return ExactDedupeFilter(separator_count)
+    if mode == 'bloom':
+        return BloomDedupeFilter(estimate_line_count(file_path), false_positive_rate, memory_cap_mb, separator_count)
+    print("Error: Unknown dedupe mode %s, use 'exact', 'bloom' or 'auto'." % mode)
+    return None
+
+class Chunk:
+    # A memoryview of one chunk of a memory-mapped file. Use it as a context manager so the view is released again,
+    # the map can not be closed while views of it exist.
+    def __init__(self, view):
+        self.view = view
+
+    def __enter__(self):
+        return self.view
+
+    def __exit__(self, *exc_info):
+        self.view.release()
+
+class FileChunker:
+    # Cuts a file into chunks of about a given size on line boundaries, using a read-only memory map.
+    # Example:
+    #     with FileChunker('potfile.txt') as chunker:
+    #         while (chunk := chunker.next_chunk(10 * 1024 * 1024)) is not None:
+    #             with chunk as data:
+    #                 encoded = base64.b64encode(data)
+    def __init__(self, file_path, start_offset=0):
+        self.file = open(file_path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        # An empty file can not be memory-mapped.
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        # Offset of the first byte that was not handed out in a chunk yet.
+        self.offset = start_offset
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def next_chunk(self, size):
+        # Return the next Chunk of at most size bytes that ends on a line break, or None at the end of the file.
+        # A single line longer than size is returned as one chunk on its own, and the last chunk ends at the end of the file.
+        if self.offset >= self.size:
+            return None
+        start = self.offset
+        end = start + max(1, int(size))
+        if end >= self.size:
+            end = self.size
+        else:
+            line_end = self.map.rfind(b'\n', start, end)
+            if line_end == -1:
+                line_end = self.map.find(b'\n', end)
+                end = self.size if line_end == -1 else line_end + 1
+            else:
+                end = line_end + 1
+        self.offset = end
+        return Chunk(memoryview(self.map)[start:end])
+
+    def next_lines(self, max_lines, max_bytes=None, block_size=1024 * 1024):
+        # Return the next Chunk of at most max_lines lines (and at most max_bytes bytes, if given), or None at the end of the file.
+        # Newlines are counted a block at a time, only the block with the last line of the chunk is searched line by line.
+        if self.offset >= self.size:
+            return None
+        start = self.offset
+        limit = self.size if max_bytes is None else min(self.size, start + max(1, int(max_bytes)))
+        lines = 0
+        position = start
+        while position < limit:
+            block_end = min(limit, position + block_size)
+            block_lines = self.map[position:block_end].count(b'\n')
+            if lines + block_lines < max_lines:
+                lines += block_lines
+                position = block_end
+                continue
+            # The chunk ends inside this block, at the max_lines-th newline.
+            while lines < max_lines:
+                position = self.map.find(b'\n', position, block_end) + 1
+                lines += 1
+            break
+        if position >= limit and limit < self.size:
+            # Cut at max_bytes, go back to the last full line. A single line longer than max_bytes is returned on its own.
+            line_end = self.map.rfind(b'\n', start, limit)
+            if line_end == -1:
+                line_end = self.map.find(b'\n', limit)
+                position = self.size if line_end == -1 else line_end + 1
+            else:
+                position = line_end + 1
+        self.offset = position
+        return Chunk(memoryview(self.map)[start:position])
+
+class ChunkSizeController:
+    # Adapts the importCracked chunk size so each request takes about target_seconds.
+    # After every chunk the measured request time (the larger of the server's processTime and the time the client waited)
+    # and linesProcessed are used to estimate how many lines per second the server handles. The next chunk size is then
+    # the number of lines the server can process in target_seconds, times the average line size. Changes are limited to
+    # max_growth per step and to the [min_bytes, max_bytes] range, so one odd response can not swing the size too far.
+    # Example:
+    #     controller = ChunkSizeController(10 * 1024 * 1024, target_seconds=30)
+    #     controller.update(chunk_bytes, process_time, lines_processed, elapsed)
+    #     next_chunk_size = controller.chunk_size
+    def __init__(self, initial_bytes, target_seconds=30, min_bytes=256 * 1024, max_bytes=200 * 1024 * 1024, max_growth=2.0, smoothing=0.5):
+        self.target_seconds = float(target_seconds)
+        self.min_bytes = int(min_bytes)
+        self.max_bytes = int(max_bytes)
+        self.max_growth = float(max_growth)
+        # Weight of the newest measurement in the moving averages (1.0 = only use the last chunk).
+        self.smoothing = float(smoothing)
+        self.chunk_size = self._clamp(int(initial_bytes))
+        self.lines_per_second = None
+        self.bytes_per_line = None
+
+    def _clamp(self, size):
+        return max(self.min_bytes, min(self.max_bytes, size))
+
+    def _average(self, average, value):
+        if average is None:
+            return value
+        return self.smoothing * value + (1 - self.smoothing) * average
+
+    def update(self, chunk_bytes, process_time, lines_processed, elapsed=0):
+        # Feed the result of one chunk to the controller and return the new chunk size in bytes.
+        seconds = max(float(process_time or 0), float(elapsed or 0))
+        if lines_processed:
+            self.bytes_per_line = self._average(self.bytes_per_line, chunk_bytes / lines_processed)
+        if seconds < 1 or not lines_processed:
+            # processTime is reported in whole seconds, so a 0 means the chunk was too small to measure. Grow it.
+            target_size = self.chunk_size * self.max_growth
+        else:
+            self.lines_per_second = self._average(self.lines_per_second, lines_processed / seconds)
+            target_size = self.lines_per_second * self.target_seconds * self.bytes_per_line
+        target_size = max(self.chunk_size / self.max_growth, min(self.chunk_size * self.max_growth, target_size))
+        self.chunk_size = self._clamp(int(target_size))
+        return self.chunk_size
+
+def default_journal_file(file_path, hashlistId):
+    # The checkpoint journal is kept next to the imported file, one per target hashlist.
+    return '%s.hashlist_%s.journal' % (file_path, hashlistId)
+
+class ImportJournal:
+    # Checkpoint journal of a precracked import. After every chunk the server acknowledged, the byte offset up to which
+    # the file is imported and the counters so far are written to a small JSON file, so an interrupted import can
+    # continue at that offset.
+    # Example journal:
+    # {
+    #     "file": "/data/potfile.txt",
+    #     "hashlistId": 5,
+    #     "fileSize": 32212254720,
+    #     "offset": 10485760,
+    #     "complete": false,
+    #     "updated": "2024-10-03 10:49:58",
+    #     "stats": {"linesProcessed": 234564, "newCracked": 12, ...}
+    # }
+    def __init__(self, journal_file, file_path, hashlistId):
+        self.journal_file = journal_file
+        self.file_path = os.path.abspath(file_path)
+        self.hashlistId = hashlistId
+
+    def load(self, file_size):
+        # Return the last checkpoint, or None if there is no usable one for this file and hashlist.
+        try:
+            with open(self.journal_file, 'r') as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            print('No checkpoint journal found at %s, starting at byte 0.' % self.journal_file)
+            return None
+        except json.JSONDecodeError:
+            print('Error: %s is not a valid checkpoint journal, starting at byte 0.' % self.journal_file)
+            return None
+        if checkpoint.get('file') != self.file_path or str(checkpoint.get('hashlistId')) != str(self.hashlistId):
+            print('Error: %s belongs to another file or hashlist, starting at byte 0.' % self.journal_file)
+            return None
+        if checkpoint.get('fileSize') != file_size or checkpoint.get('offset', 0) > file_size:
+            print('Error: %s was written for a file of a different size, starting at byte 0.' % self.journal_file)
+            return None
+        return checkpoint
+
+    def commit(self, offset, file_size, stats, complete=False):
+        checkpoint = {
+            "file": self.file_path,
+            "hashlistId": self.hashlistId,
+            "fileSize": file_size,
+            "offset": offset,
+            "complete": complete,
+            "updated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "stats": stats
+        }
+        with common.atomic_write(self.journal_file) as f:
+            json.dump(checkpoint, f, indent=4)
@@ -0,0 +1,108 @@
+#!/bin/env python3
+import codecs
+import json
+
+# Incremental JSON parsing for large API responses.
+# Instead of decoding a full response body with json.loads(), the body is read in byte chunks and the items of one
+# array inside the top level object are decoded and yielded one at a time, so only the current item and a small read
+# buffer are kept in memory no matter how large the array is.
+
+_decoder = json.JSONDecoder()
+_whitespace = ' \t\n\r'
+# Characters that can follow an array item.
+_item_end = ',]' + _whitespace
+
+class JSONStreamError(ValueError):
+    # Raised when the streamed response is not valid JSON or the array key could not be found.
+    def __init__(self, message, header=''):
+        super().__init__(message)
+        # The text of the top level object before the array, e.g. '{"section":"hashlist","request":"getCracked","response":"ERROR",...'.
+        self.header = header
+
+def iter_array_items(byte_chunks, key):
+    # Yield the items of the array stored under "key" in a top level JSON object.
+    # byte_chunks is any iterable of bytes, e.g. requests' response.iter_content().
+    # Example: for {"response":"OK","cracked":[{"hash":"a"},{"hash":"b"}]} and key "cracked" this yields
+    # {"hash":"a"} and then {"hash":"b"}.
+    utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(byte_chunks)
+    buffer = ''
+    position = 0
+    finished = False
+
+    def read_more():
+        # Append the next chunk to the buffer. Returns False when there is no more data.
+        nonlocal buffer, position, finished
+        if finished:
+            return False
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            finished = True
+            buffer = buffer[position:] + utf8_decoder.decode(b'', final=True)
+            position = 0
+            return False
+        buffer = buffer[position:] + utf8_decoder.decode(chunk)
+        position = 0
+        return True
+
+    # Find the start of the array. The text in front of it is kept so errors can show the response header.
+    header = ''
+    marker = '"%s"' % key
+    while True:
+        index = buffer.find(marker)
+        if index != -1:
+            header += buffer[:index]
+            position = index + len(marker)
+            break
+        # Keep the tail of the buffer in case the marker is split over two chunks.
+        keep = len(marker) - 1
+        header += buffer[:max(0, len(buffer) - keep)]
+        position = max(0, len(buffer) - keep)
+        if not read_more():
+            raise JSONStreamError('Key "%s" not found in the response.' % key, header + buffer)
+    for expected in ':[':
+        while True:
+            while position < len(buffer) and buffer[position] in _whitespace:
+                position += 1
+            if position < len(buffer):
+                break
+            if not read_more():
+                raise JSONStreamError('Unexpected end of the response.', header)
+        if buffer[position] != expected:
+            raise JSONStreamError('Key "%s" is not an array.' % key, header)
+        position += 1
+
+    # Decode one array item at a time.
+    expect_item = True
+    while True:
+        while position < len(buffer) and buffer[position] in _whitespace:
+            position += 1
+        if position >= len(buffer):
+            if not read_more():
+                raise JSONStreamError('Unexpected end of the response.', header)
+            continue
+        character = buffer[position]
+        if character == ']':
+            return
+        if character == ',' and not expect_item:
+            position += 1
+            expect_item = True
+            continue
+        if not expect_item:
+            raise JSONStreamError('Invalid JSON in the response.', header)
+        try:
+            item, end = _decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The item is most likely cut off at the end of the buffer, read more data and try again.
+            if not read_more():
+                raise JSONStreamError('Invalid JSON in the response.', header)
+            continue
+        # A number at the end of the buffer may be cut off, e.g. 12 of 1234 or 1 of 1.5e10, so make sure the item is
+        # followed by a character that can end it.
+        if (end >= len(buffer) or buffer[end] not in _item_end) and not finished:
+            read_more()
+            continue
+        position = end
+        expect_item = False
+        yield item
@@ -0,0 +1,108 @@
+#!/bin/env python3
+import heapq
+import os
+import tempfile
+import threading
+import inc.common as common
+
+# Helpers to build large, sorted and de-duplicated wordlists without holding them in memory.
+# Plaintexts are collected in an in-memory set. When the set grows over the memory budget it is sorted and spilled to a
+# temporary "run" file on disk. At the end all runs and the remaining set are merged (external merge sort) and written
+# straight to the output wordlist, dropping duplicates on the way.
+
+# Rough number of bytes a str in a set costs on top of its characters (object header plus set slot).
+_entry_overhead = 100
+
+def encode_plain(plain):
+    # Plaintexts with line breaks cannot be written to a line based wordlist as they are, so they are written in the
+    # hashcat $HEX[...] notation instead.
+    if '\n' in plain or '\r' in plain:
+        return '$HEX[%s]' % plain.encode('utf-8', 'surrogateescape').hex()
+    return plain
+
+class PlaintextCollector:
+    # Collects plaintexts from one or more threads and writes them sorted and unique to a wordlist.
+    # memory_budget_mb=None keeps all plaintexts in memory and never spills. Only then can hex_encode be turned off to
+    # keep plaintexts with line breaks as they are, because the run files are line based.
+    # Example:
+    #     collector = PlaintextCollector(memory_budget_mb=256)
+    #     collector.add_many(['password', 'letmein'])
+    #     collector.write('wordlist.txt')
+    def __init__(self, memory_budget_mb=512, temp_dir=None, hex_encode=True):
+        if not hex_encode and memory_budget_mb is not None:
+            raise ValueError('hex_encode=False needs memory_budget_mb=None')
+        self.memory_budget_bytes = None if memory_budget_mb is None else int(memory_budget_mb * 1024 * 1024)
+        self.temp_dir = temp_dir
+        self.hex_encode = hex_encode
+        self.plains = set()
+        self.plains_bytes = 0
+        self.run_files = []
+        self.lock = threading.Lock()
+
+    def add_many(self, plains):
+        # Add a batch of plaintexts. Empty plaintexts are skipped.
+        with self.lock:
+            for plain in plains:
+                if not plain:
+                    continue
+                if self.hex_encode:
+                    plain = encode_plain(plain)
+                if plain not in self.plains:
+                    self.plains.add(plain)
+                    self.plains_bytes += len(plain) + _entry_overhead
+                    if self.memory_budget_bytes is not None and self.plains_bytes > self.memory_budget_bytes:
+                        self._spill()
+
+    def add(self, plain):
+        self.add_many((plain,))
+
+    def _spill(self):
+        # Write the current set as a sorted run file and start a new empty set.
+        run_file = tempfile.NamedTemporaryFile('w', encoding='utf-8', errors='surrogateescape', newline='\n',
+                                               prefix='wordlist_run_', suffix='.txt', dir=self.temp_dir, delete=False)
+        with run_file:
+            for plain in sorted(self.plains):
+                run_file.write(plain + '\n')
+        self.run_files.append(run_file.name)
+        self.plains = set()
+        self.plains_bytes = 0
+
+    def iter_sorted(self, merge_with=None):
+        # Yield all collected plaintexts sorted and without duplicates, merging the run files with the in-memory set.
+        # merge_with can be an existing sorted wordlist (e.g. one written by write()) whose lines are merged in as well.
+        run_file_names = list(self.run_files)
+        if merge_with:
+            run_file_names.append(merge_with)
+        run_files = [open(run_file, 'r', encoding='utf-8', errors='surrogateescape', newline='\n') for run_file in run_file_names]
+        try:
+            sources = [(line.rstrip('\n') for line in run_file) for run_file in run_files]
+            sources.append(iter(sorted(self.plains)))
+            previous = None
+            for plain in heapq.merge(*sources):
+                if plain != previous:
+                    yield plain
+                    previous = plain
+        finally:
+            for run_file in run_files:
+                run_file.close()
+
+    def write(self, output_file, merge_with=None):
+        # Write the sorted, unique plaintexts to output_file, one per line. Returns the number of lines written.
+        # merge_with is passed on to iter_sorted(), it may be output_file itself to add new plaintexts to an existing wordlist.
+        count = 0
+        with common.atomic_write(output_file, 'w', encoding='utf-8', errors='surrogateescape', newline='\n') as output:
+            for plain in self.iter_sorted(merge_with=merge_with):
+                output.write(plain + '\n')
+                count += 1
+        return count
+
+    def cleanup(self):
+        # Remove the temporary run files.
+        for run_file in self.run_files:
+            try:
+                os.remove(run_file)
+            except FileNotFoundError:
+                pass
+        self.run_files = []
+        self.plains = set()
+        self.plains_bytes = 0
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are imported as inc.<module>, like hashmaster.py does, so the repository root has to be on the path.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
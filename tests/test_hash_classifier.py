@@ -0,0 +1,19 @@
+import inc.hash_classifier as hash_classifier
+
+def test_every_line_is_counted(tmp_path):
+    # A \r inside a line is not a line break, the line goes to the unknown bucket instead of being dropped.
+    intake = tmp_path / 'intake.txt'
+    intake.write_bytes(b'098f6bcd4621d373cade4e832627b4f6\r\n'
+                       b'  a94a8fe5ccb19ba61c4c0873d391e987982fbbd3  \n'
+                       b'098f6bcd4621d373cade4e83\r2627b4f6\r\n'
+                       b'not a hash\n'
+                       b'\n'
+                       b'last\rline')
+    result = hash_classifier.classify_file(str(intake), output_dir=str(tmp_path / 'split'))
+    assert result['buckets']['0']['lines'] == 1
+    assert result['buckets']['100']['lines'] == 1
+    assert result['unknown']['lines'] == 3
+    with open(result['unknown']['file'], 'rb') as unknown_file:
+        assert unknown_file.read() == b'098f6bcd4621d373cade4e83\r2627b4f6\nnot a hash\nlast\rline\n'
+    with open(result['buckets']['100']['file'], 'rb') as sha1_file:
+        assert sha1_file.read() == b'a94a8fe5ccb19ba61c4c0873d391e987982fbbd3\n'
@@ -0,0 +1,31 @@
+import re
+import inc.algorithms as algorithms
+import inc.hash_validation as hash_validation
+
+def test_negated_classes_exclude_line_breaks():
+    # A negated class without \r\n matches across lines when a whole chunk is validated with one findall().
+    for hashtype, hash_format in algorithms.hash_formats.items():
+        for negated in re.findall(r'\[\^([^\]]*)\]', hash_format.get('pattern', '')):
+            assert '\\r' in negated and '\\n' in negated, hashtype
+
+def test_invalid_line_is_not_joined_to_the_next_line():
+    # "$1$salt" is cut off, the [^$:] salt class must not run on into the following line.
+    validator = hash_validation.get_validator(500)
+    data = b'$1$sa\nlt$abcdefghijklmnopqrstuv\n$1$salt$abcdefghijklmnopqrstuv\n'
+    valid, invalid = validator.filter_chunk(data)
+    assert valid == b'$1$salt$abcdefghijklmnopqrstuv\n'
+    assert invalid == 2
+
+def test_netntlmv2_lines_are_validated_separately():
+    validator = hash_validation.get_validator(5600)
+    line = b'admin::N46iSNekpT:08ca45b7d7ea58ee:88dcbe4446168966a153a0064958dac6:5c7830315c78303100000000000000\n'
+    valid, invalid = validator.filter_chunk(b'admin\n' + line)
+    assert valid == line
+    assert invalid == 1
+
+def test_cracked_lines_keep_control_characters_in_the_plain():
+    validator = hash_validation.get_validator(0, cracked=True)
+    data = b'098f6bcd4621d373cade4e832627b4f6:te\x0bst\r\nnot a hash\n\n'
+    valid, invalid = validator.filter_chunk(memoryview(data))
+    assert valid == b'098f6bcd4621d373cade4e832627b4f6:te\x0bst\r\n'
+    assert invalid == 2
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+import pytest
+import inc.hashes_com as hashes_com
+
+def job(id, algorithm_id, price, created_at):
+    return {"id": id, "algorithmId": algorithm_id, "pricePerHashUsd": price, "createdAt": created_at}
+
+@pytest.fixture
+def jobs(monkeypatch):
+    now = datetime.now()
+    recent = (now - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S')
+    old = (now - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
+    jobs_list = [
+        job(1, 0, "0.500", old),
+        job(2, 1000, "2.000", recent),
+        job(3, 1, "9.000", recent),
+        job(4, 1000, "1.000", "not a date"),
+        job(5, 100, "3.000", old),
+        job(6, 1000, "5.000", old)
+    ]
+    monkeypatch.setattr(hashes_com.http_cache, 'get_json', lambda url: {"success": True, "list": jobs_list})
+    return jobs_list
+
+def ids(jobs_list):
+    return [job['id'] for job in jobs_list]
+
+def test_a_string_id_is_one_algorithm(jobs):
+    board = hashes_com.get_job_board('https://hashes.com', 'key')
+    assert ids(board.query('1000')) == [6, 2, 4]
+    assert ids(board.query(1000)) == [6, 2, 4]
+    assert ids(hashes_com.get_jobs('https://hashes.com', 'key', '1000')) == [6, 2, 4]
+
+def test_a_set_of_ids_keeps_the_price_order(jobs):
+    board = hashes_com.get_job_board('https://hashes.com', 'key')
+    assert ids(board.query({0, 1000, 100})) == [6, 5, 2, 4, 1]
+    assert ids(board.query(['1', 7])) == [3]
+    assert board.query({7, 8}) == []
+
+def test_hash_age_window_and_unparsable_created_at(jobs):
+    board = hashes_com.get_job_board('https://hashes.com', 'key')
+    # The job with an unparsable createdAt is kept without a time filter and dropped by one.
+    assert ids(board.query(hash_age_window=24)) == [3, 2]
+    assert ids(board.query(1000, created_at=datetime.now() - timedelta(days=365))) == [6, 2]
+    assert ids(board.query(1000, min_price_per_hash=2)) == [6, 2]
@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import inc.http_cache as http_cache
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    # Serves server.body with an ETag and answers a matching If-None-Match with 304.
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        etag = '"%s"' % server.version
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps(server.body).encode()
+        self.send_response(server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), CatalogHandler)
+    httpd.requests = []
+    httpd.body = [{"id": 1, "hash_type": 1000}]
+    httpd.version = 1
+    httpd.status = 200
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    httpd.url = 'http://127.0.0.1:%d/api/v2/hashlist' % httpd.server_address[1]
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(http_cache.settings, 'enabled', True)
+    monkeypatch.setitem(http_cache.settings, 'cache_dir', str(tmp_path))
+    monkeypatch.setitem(http_cache.settings, 'ttl', 60)
+    return tmp_path
+
+def expire(url):
+    cache_file = http_cache._cache_file(url)
+    past = time.time() - 3600
+    os.utime(cache_file, (past, past))
+    return cache_file
+
+def test_200_is_cached_as_json(server, cache_dir):
+    assert http_cache.get_json(server.url) == server.body
+    assert len(server.requests) == 1
+    cache_files = os.listdir(cache_dir)
+    assert len(cache_files) == 1
+    with open(os.path.join(cache_dir, cache_files[0]), encoding='utf-8') as f:
+        assert json.loads(f.readline()) == {"etag": '"1"', "last_modified": None}
+        assert json.loads(f.read()) == server.body
+
+def test_fresh_entry_is_returned_without_a_request(server):
+    first = http_cache.get_json(server.url)
+    first.append('changed by the caller')
+    assert http_cache.get_json(server.url) == server.body
+    assert len(server.requests) == 1
+
+def test_304_after_ttl_returns_cached_body_and_restarts_ttl(server):
+    http_cache.get_json(server.url)
+    cache_file = expire(server.url)
+    assert http_cache.get_json(server.url) == server.body
+    assert len(server.requests) == 2
+    assert server.requests[1]['If-None-Match'] == '"1"'
+    assert time.time() - os.path.getmtime(cache_file) < 60
+    # The TTL was restarted, so the next call does not ask the server.
+    assert http_cache.get_json(server.url) == server.body
+    assert len(server.requests) == 2
+
+def test_changed_response_after_ttl_replaces_the_entry(server):
+    http_cache.get_json(server.url)
+    expire(server.url)
+    server.version = 2
+    server.body = [{"id": 2, "hash_type": 0}]
+    assert http_cache.get_json(server.url) == [{"id": 2, "hash_type": 0}]
+    expire(server.url)
+    assert http_cache.get_json(server.url) == [{"id": 2, "hash_type": 0}]
+    assert server.requests[-1]['If-None-Match'] == '"2"'
+
+def test_ttl_zero_always_revalidates(server):
+    http_cache.get_json(server.url, ttl=0)
+    http_cache.get_json(server.url, ttl=0)
+    assert len(server.requests) == 2
+    assert 'If-None-Match' not in server.requests[0]
+    assert server.requests[1]['If-None-Match'] == '"1"'
+
+def test_damaged_cache_file_is_a_miss(server):
+    http_cache.get_json(server.url)
+    cache_file = expire(server.url)
+    with open(cache_file, 'wb') as f:
+        f.write(b'\x80\x04\x95 not json')
+    assert http_cache.get_json(server.url) == server.body
+    assert 'If-None-Match' not in server.requests[-1]
+
+def test_error_status_returns_none_and_is_not_cached(server, cache_dir):
+    server.status = 500
+    assert http_cache.get_json(server.url) is None
+    assert os.listdir(cache_dir) == []
+
+def test_unreachable_server_returns_none():
+    assert http_cache.get_json('http://127.0.0.1:1/closed') is None
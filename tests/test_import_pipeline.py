@@ -0,0 +1,87 @@
+import random
+import pytest
+import inc.import_pipeline as import_pipeline
+
+def test_split_lines_only_splits_on_newline():
+    data = b'hash1:pl\rain\nhash2:a\x0bb\x0cc\x1cd\x1ee\r\nlast'
+    assert import_pipeline.split_lines(data) == [b'hash1:pl\rain\n', b'hash2:a\x0bb\x0cc\x1cd\x1ee\r\n', b'last']
+    assert import_pipeline.split_lines(b'a\n\nb\n') == [b'a\n', b'\n', b'b\n']
+    assert import_pipeline.split_lines(b'') == []
+
+def test_line_blocks_end_on_line_breaks():
+    rng = random.Random(1)
+    for _ in range(200):
+        data = b''.join(bytes(rng.choice(b'ab:\r\x0b') for _ in range(rng.randint(0, 20))) + b'\n' for _ in range(rng.randint(0, 30)))
+        if data and rng.random() < 0.5:
+            data = data[:-1]
+        blocks = list(import_pipeline.iter_line_blocks(memoryview(data), block_size=rng.randint(1, 16)))
+        assert b''.join(blocks) == data
+        assert all(block.endswith(b'\n') for block in blocks[:-1])
+
+def test_left_hash_filter():
+    left_filter = import_pipeline.LeftHashFilter([b'098F6BCD4621D373CADE4E832627B4F6', b'', b'5f4dcc3b5aa765d61d8327deb882cf99'])
+    data = (b'098f6bcd4621d373cade4e832627b4f6:test\n'
+            b'ffffffffffffffffffffffffffffffff:nope\n'
+            b'5f4dcc3b5aa765d61d8327deb882cf99:pass\x0bword\n')
+    assert left_filter.filter_chunk(memoryview(data)) == (
+        b'098f6bcd4621d373cade4e832627b4f6:test\n5f4dcc3b5aa765d61d8327deb882cf99:pass\x0bword\n', 1)
+
+def test_left_hash_filter_with_salted_left_list():
+    left_filter = import_pipeline.LeftHashFilter([b'hash:salt'])
+    assert left_filter.separator_counts == [1]
+    assert left_filter.matches(b'hash:salt:plain:with:colons\n')
+    assert not left_filter.matches(b'hash:other:plain\n')
+
+def test_exact_dedupe_keeps_the_first_line():
+    dedupe = import_pipeline.ExactDedupeFilter()
+    kept, dropped = dedupe.filter_chunk(b'a:1\nb:2\na:1\r\n')
+    assert (kept, dropped) == (b'a:1\nb:2\n', 1)
+    # The filter remembers lines across chunks.
+    assert dedupe.filter_chunk(b'b:2\nc:3\n') == (b'c:3\n', 1)
+    assert dedupe.duplicates == 2
+
+def test_dedupe_by_hash():
+    dedupe = import_pipeline.ExactDedupeFilter(separator_count=0)
+    assert dedupe.filter_chunk(b'AB:one\nab:two\ncd:three\n') == (b'AB:one\ncd:three\n', 1)
+
+def test_bloom_dedupe_never_lets_a_duplicate_through():
+    dedupe = import_pipeline.BloomDedupeFilter(expected_lines=10000, false_positive_rate=0.001)
+    lines = [b'%032x:%d\n' % (i, i) for i in range(10000)]
+    kept, dropped = dedupe.filter_chunk(b''.join(lines))
+    assert dropped < 50
+    assert dedupe.filter_chunk(b''.join(lines)) == (b'', 10000)
+
+def test_auto_dedupe_mode_uses_the_memory_estimate(tmp_path):
+    import_file = tmp_path / 'import.txt'
+    import_file.write_bytes(b''.join(b'%032x:password%d\n' % (i, i) for i in range(20000)))
+    assert isinstance(import_pipeline.make_dedupe_filter(str(import_file), 'auto', memory_cap_mb=10), import_pipeline.ExactDedupeFilter)
+    assert isinstance(import_pipeline.make_dedupe_filter(str(import_file), 'auto', memory_cap_mb=1), import_pipeline.BloomDedupeFilter)
+
+def test_filter_chain_runs_every_filter():
+    class NoComments(import_pipeline.LineFilter):
+        def matches(self, line):
+            return not line.startswith(b'#')
+    chain = import_pipeline.FilterChain([NoComments(), None, import_pipeline.ExactDedupeFilter()])
+    assert chain.filter_chunk(memoryview(b'#x\na\na\nb')) == (b'a\nb', 2)
+
+@pytest.mark.parametrize('size', [1, 5, 13, 1000])
+def test_file_chunker_cuts_on_line_breaks(tmp_path, size):
+    data = b''.join(b'line %d\x0b\r\n' % i for i in range(100)) + b'no line break at the end'
+    import_file = tmp_path / 'import.txt'
+    import_file.write_bytes(data)
+    chunks = []
+    with import_pipeline.FileChunker(str(import_file)) as chunker:
+        while (chunk := chunker.next_chunk(size)) is not None:
+            with chunk as view:
+                chunks.append(bytes(view))
+    assert b''.join(chunks) == data
+    assert all(chunk.endswith(b'\n') for chunk in chunks[:-1])
+
+def test_file_chunker_next_lines_and_resume_offset(tmp_path):
+    import_file = tmp_path / 'import.txt'
+    import_file.write_bytes(b''.join(b'%d\n' % i for i in range(10)))
+    with import_pipeline.FileChunker(str(import_file), start_offset=4) as chunker:
+        with chunker.next_lines(3) as view:
+            assert bytes(view) == b'2\n3\n4\n'
+        with chunker.next_lines(100, max_bytes=5) as view:
+            assert bytes(view) == b'5\n6\n'
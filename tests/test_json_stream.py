@@ -0,0 +1,39 @@
+import json
+import pytest
+import inc.json_stream as json_stream
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_items_are_yielded_in_order_for_any_chunk_size():
+    response = {"section": "hashlist", "request": "getCracked", "response": "OK",
+                "cracked": [{"hash": "%032x" % i, "plain": "pässwörd %d €" % i, "crackpos": str(i * 1234)} for i in range(50)]}
+    data = json.dumps(response, ensure_ascii=False, indent=1).encode('utf-8')
+    for size in (1, 2, 3, 7, 64, len(data)):
+        assert list(json_stream.iter_array_items(chunked(data, size), 'cracked')) == response['cracked']
+
+def test_numbers_cut_at_a_chunk_boundary_are_not_split():
+    data = b'{"response":"OK","values":[1234567,89,1.5e10]}'
+    for size in range(1, len(data)):
+        assert list(json_stream.iter_array_items(chunked(data, size), 'values')) == [1234567, 89, 1.5e10]
+
+def test_empty_array():
+    assert list(json_stream.iter_array_items([b'{"response":"OK","cracked":[ ]}'], 'cracked')) == []
+
+def test_missing_key_keeps_the_response_header():
+    data = b'{"section":"hashlist","request":"getCracked","response":"ERROR","message":"Invalid hashlist!"}'
+    with pytest.raises(json_stream.JSONStreamError) as error:
+        list(json_stream.iter_array_items(chunked(data, 5), 'cracked'))
+    assert '"response":"ERROR"' in error.value.header
+
+def test_key_that_is_not_an_array():
+    with pytest.raises(json_stream.JSONStreamError):
+        list(json_stream.iter_array_items([b'{"cracked": 5}'], 'cracked'))
+
+def test_cut_off_response_raises_after_the_complete_items():
+    data = b'{"response":"OK","cracked":[{"hash":"a"},{"hash":"b"},{"ha'
+    items = []
+    with pytest.raises(json_stream.JSONStreamError):
+        for item in json_stream.iter_array_items(chunked(data, 4), 'cracked'):
+            items.append(item)
+    assert items == [{"hash": "a"}, {"hash": "b"}]